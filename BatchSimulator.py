@@ -0,0 +1,137 @@
+from SearchAgent import SearchAgent
+from FeedbackMatrix import FeedbackMatrix, SOLVED_PATTERN, pattern_to_ratings
+from constants import MAX_GUESS_LIMIT, MAX_GUESS_COUNT
+
+from typing import Callable
+import time
+import numpy as np
+
+
+class BatchSimulator:
+    """ Plays many games at once, one turn at a time. Games which have had the same
+        feedback so far are grouped, and each group is played by one agent, so a
+        deterministic agent decides once for the whole group instead of once per game.
+        When a group's games get different feedback, the agent is forked (see
+        SearchAgent.fork) and each fork continues with the games that got the same
+        feedback. Solved games are retired, so playing every answer becomes a walk of
+        the agent's tree of guesses.
+
+        Games are scored like GameManager: guesses that aren't in the feedback matrix
+        are asked for again without being counted, and a game fails if the agent
+        gives up or makes guess_limit guesses. Every answer must be in the feedback
+        matrix. """
+    def __init__(self, create_agent: Callable[[], SearchAgent], feedback_matrix: FeedbackMatrix, guess_limit: int=MAX_GUESS_LIMIT):
+        # Returns a new agent, used for the first turn of every batch
+        self.create_agent = create_agent
+        self.feedback_matrix = feedback_matrix
+        self.guess_limit = guess_limit
+        self.dataCollector = None
+
+
+    def attachDataCollector(self, dataCollector):
+        self.dataCollector = dataCollector
+
+    def getDataCollector(self):
+        return self.dataCollector
+
+
+    def play(self, answers: list[str]) -> dict[str, list[str]]:
+        """ Plays a game for each of the given answers, and returns the guesses of each
+            game, keyed by answer. The guesses of a solved game end with its answer.
+            If a data collector is attached, a row is recorded for each solved game, in
+            the order of the answers. Each game is credited with the full time of every
+            decision made for its group. """
+        answer_index = self.feedback_matrix.answer_index
+        missing = [answer for answer in answers if answer not in answer_index]
+        if missing:
+            raise ValueError(f"Answers not in the feedback matrix: {missing[:10]}")
+        # Column of the answer of each game
+        columns = np.array([answer_index[answer] for answer in answers], dtype=np.intp)
+        guesses = [[] for _ in answers]
+        guess_durations = [[] for _ in answers]
+        game_durations = [0.0] * len(answers)
+        is_solved = np.zeros(len(answers), dtype=bool)
+
+        # Groups of games with the same feedback so far, as (agent, game indices)
+        groups = [(self.create_agent(), np.arange(len(answers)))]
+        turn = 0
+        while groups and turn < self.guess_limit:
+            turn += 1
+            # Get one guess for each group
+            playing = []
+            for agent, games in groups:
+                start_time = time.process_time()
+                row = self.get_guess_row(agent)
+                duration = time.process_time() - start_time
+                for game in games:
+                    guess_durations[game].append(duration)
+                    game_durations[game] += duration
+                # The agent gave up, so its games fail
+                if row is None:
+                    continue
+                guess = self.feedback_matrix.guess_words[row]
+                for game in games:
+                    guesses[game].append(guess)
+                playing.append((agent, games, row))
+            if not playing:
+                break
+
+            # Rate every game's guess in one lookup
+            rows = np.repeat([row for _, _, row in playing], [len(games) for _, games, _ in playing])
+            all_games = np.concatenate([games for _, games, _ in playing])
+            patterns = self.feedback_matrix.patterns[rows, columns[all_games]]
+
+            groups = []
+            offset = 0
+            for agent, games, row in playing:
+                group_patterns = patterns[offset:offset + len(games)]
+                offset += len(games)
+                # Retire solved games
+                solved = group_patterns == SOLVED_PATTERN
+                is_solved[games[solved]] = True
+                games = games[~solved]
+                group_patterns = group_patterns[~solved]
+                if len(games) == 0:
+                    continue
+                guess = self.feedback_matrix.guess_words[row]
+                unique_patterns = np.unique(group_patterns)
+                for i, pattern in enumerate(unique_patterns):
+                    # Fork the agent for every pattern but the last, which continues
+                    # with the agent itself
+                    child = agent if i == len(unique_patterns) - 1 else agent.fork()
+                    child_games = games[group_patterns == pattern]
+                    start_time = time.process_time()
+                    child.process_feedback(guess, pattern_to_ratings(int(pattern)))
+                    duration = time.process_time() - start_time
+                    for game in child_games:
+                        game_durations[game] += duration
+                    groups.append((child, child_games))
+
+        if self.dataCollector is not None:
+            self.record_games(answers, guesses, guess_durations, game_durations, is_solved)
+        return {answer: game_guesses for answer, game_guesses in zip(answers, guesses)}
+
+
+    def get_guess_row(self, agent: SearchAgent) -> int:
+        """ Returns the feedback matrix row of the agent's next guess, or None if the
+            agent gives up. Guesses that aren't in the matrix are asked for again. """
+        guess_index = self.feedback_matrix.guess_index
+        for _ in range(self.guess_limit):
+            guess = agent.get_guess()
+            if guess is None:
+                return None
+            if guess in guess_index:
+                return guess_index[guess]
+        return None
+
+
+    def record_games(self, answers: list[str], guesses: list[list], guess_durations: list[list], game_durations: list[float], is_solved: np.ndarray):
+        """ Records a row for each solved game in the attached data collector """
+        for game, answer in enumerate(answers):
+            if not is_solved[game]:
+                print("Agent was unable to solve the game with answer", answer)
+                continue
+            guess_count = len(guesses[game])
+            avg_guess_time = sum(guess_durations[game]) / len(guess_durations[game])
+            successful = guess_count <= MAX_GUESS_COUNT
+            self.dataCollector.recordData([ answer, guess_count, successful, avg_guess_time, game_durations[game] ])
@@ -0,0 +1,294 @@
+import DataCache
+import Tester
+from DataManager import DataManager
+from Profiler import Profiler
+from ReportDataCollector import ReportDataCollector
+from constants import AGENT_TYPES
+
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+import hashlib
+import json
+import math
+import multiprocessing
+import os
+import platform
+import sys
+import time
+
+try:
+    import resource
+except ImportError:
+    # Not available on Windows, where peak memory isn't recorded
+    resource = None
+
+""" This file benchmarks every agent on fixed sets of answers, and compares the results
+    with a baseline file to catch regressions """
+
+
+# File the baseline results are kept in
+BASELINE_FILE = 'benchmark_baseline.json'
+# Sets of answers to play: the modes of DataManager.get_answers, and every answer
+BENCHMARK_SUITES = ('easy', 'hard', 'random', 'full')
+# Number of games in every suite except 'full'
+BENCHMARK_LENGTH = 100
+# Seed of the random suite, so every run plays the same answers
+BENCHMARK_SEED = 2315
+# Percentiles of guess latency that are recorded
+LATENCY_PERCENTILES = (50, 90, 99)
+# Percentiles of guess latency that fail the benchmark if they regress
+CHECKED_PERCENTILES = ('p50', 'p90')
+# Fraction by which a latency percentile can grow before it's a regression
+LATENCY_TOLERANCE = 0.25
+# Latency growth (in ms) which is never a regression, so timer noise doesn't fail
+# agents that guess in well under a millisecond
+LATENCY_SLACK_MS = 0.05
+# Amount by which the solve rate can drop before it's a regression
+SOLVE_RATE_TOLERANCE = 0.005
+
+
+def get_suite_words(data_manager: DataManager, suite: str, length: int, seed: int) -> list:
+    """ Returns the answers of the given suite """
+    if suite == 'full':
+        return list(data_manager.answer_words_ordered)
+    return data_manager.get_answers(length, suite, seed)
+
+
+def get_percentile(sorted_values: list, percentile: float) -> float:
+    """ Returns the given percentile of the sorted values, by the nearest-rank method """
+    if not sorted_values:
+        return 0.0
+    rank = math.ceil(percentile / 100 * len(sorted_values))
+    return sorted_values[max(0, rank - 1)]
+
+
+def get_peak_rss() -> float:
+    """ Returns the peak resident memory of this process in MB, or None if it can't be
+        measured """
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Reported in bytes on macOS and in kilobytes elsewhere
+    if sys.platform == 'darwin':
+        peak /= 1024
+    return round(peak / 1024, 1)
+
+
+def time_guesses(guesser, latencies: list):
+    """ Replaces the method of the given agent (or CSP dictionary) that makes each
+        guess, its 'guess' phase (see Profiler.py), with one that appends the wall time
+        of each call to latencies, in nanoseconds measured with perf_counter_ns """
+    get_time = time.perf_counter_ns
+    for method_name, phase in guesser.PROFILED_METHODS.items():
+        if phase != 'guess':
+            continue
+        method = getattr(guesser, method_name)
+
+        def timed_guess(*args, method=method, **kwargs):
+            start = get_time()
+            try:
+                return method(*args, **kwargs)
+            finally:
+                latencies.append(get_time() - start)
+
+        setattr(guesser, method_name, timed_guess)
+
+
+def run_suite(agent_type: str, suite: str, length: int, seed: int) -> dict:
+    """ Plays every game of the given suite with the given agent and returns its results.
+        This is run in a new process for each suite (see run_benchmark), so the peak
+        memory is that of the suite alone. """
+    data_manager = DataManager()
+    words = get_suite_words(data_manager, suite, length, seed)
+    # Build the shared data before timing
+    data_manager.get_feedback_matrix()
+    if agent_type == 'tree':
+        data_manager.get_decision_tree()
+
+    guess_latencies = []
+    guess_counts = Counter()
+    solved_count = 0
+    unsolved_count = 0
+    nodes_expanded = None
+    start_time = time.perf_counter()
+    for word in words:
+        dataCollector = ReportDataCollector()
+        # Games don't print, since printing would dominate the time of fast agents
+        game = Tester.create_game(agent_type, word, data_manager, dataCollector, verbose=False)
+        # Count nodes expanded by tree agents. Only expand() is wrapped, so the
+        # guesses aren't slowed down by profiling every phase.
+        counter = None
+        agent = getattr(game, 'agent', None)
+        # The game's own guess durations are CPU times, so guesses are timed here
+        time_guesses(agent if agent is not None else game.dictionary, guess_latencies)
+        if hasattr(agent, 'expand'):
+            counter = Profiler()
+            counter.wrap(agent, 'expand', 'expand')
+        if Tester.play_game(game, word) is not None:
+            row = dataCollector.RunTimeData[0]
+            guess_counts[row['Guess Count']] += 1
+            solved_count += row['Success']
+        else:
+            unsolved_count += 1
+        if counter is not None:
+            nodes_expanded = (nodes_expanded or 0) + counter.phase_calls['expand']
+    wall_time = time.perf_counter() - start_time
+
+    guess_latencies.sort()
+    latency = {f'p{percentile}': round(get_percentile(guess_latencies, percentile) / 1e6, 4)
+               for percentile in LATENCY_PERCENTILES}
+    latency['max'] = round(guess_latencies[-1] / 1e6, 4) if guess_latencies else 0.0
+    return {
+        # Identifies the answers, so results are only compared on the same games
+        'answers': hashlib.sha256(' '.join(words).encode()).hexdigest()[:16],
+        'games': len(words),
+        'solve rate': round(solved_count / len(words), 4),
+        'wall time (s)': round(wall_time, 3),
+        'guess latency (ms)': latency,
+        'nodes expanded': nodes_expanded,
+        'peak RSS (MB)': get_peak_rss(),
+        # Number of games with each guess count, and games the agent couldn't finish
+        'guess counts': {str(count): guess_counts[count] for count in sorted(guess_counts)},
+        'unsolved': unsolved_count,
+    }
+
+
+def run_benchmark(agent_types: list, suites: list, length: int, seed: int) -> dict:
+    """ Runs every suite with every agent and returns the results, keyed by agent type
+        and then suite """
+    results = dict()
+    # Spawn a fresh process for every suite, so memory and caches aren't shared
+    # between suites
+    context = multiprocessing.get_context('spawn')
+    for agent_type in agent_types:
+        results[agent_type] = dict()
+        for suite in suites:
+            with ProcessPoolExecutor(1, mp_context=context) as executor:
+                result = executor.submit(run_suite, agent_type, suite, length, seed).result()
+            results[agent_type][suite] = result
+            print(f"{agent_type:8} {suite:7} {result['games']:5} games  "
+                  f"solve rate {result['solve rate']:.4f}  "
+                  f"p50 {result['guess latency (ms)']['p50']:.3f} ms  "
+                  f"p90 {result['guess latency (ms)']['p90']:.3f} ms  "
+                  f"wall {result['wall time (s)']:.2f} s", flush=True)
+    return results
+
+
+def find_regressions(results: dict, baseline: dict) -> list[str]:
+    """ Returns a description of every result which is worse than its baseline by
+        more than the tolerances """
+    regressions = []
+    for agent_type, suites in results.items():
+        for suite, result in suites.items():
+            base = baseline.get(agent_type, {}).get(suite)
+            if base is None:
+                print("No baseline for", agent_type, suite)
+                continue
+            if base['answers'] != result['answers']:
+                print("Baseline of", agent_type, suite, "played different answers, and was not compared")
+                continue
+            name = f"{agent_type} {suite}"
+            if result['solve rate'] < base['solve rate'] - SOLVE_RATE_TOLERANCE:
+                regressions.append(f"{name}: solve rate fell from {base['solve rate']} to {result['solve rate']}")
+            for percentile in CHECKED_PERCENTILES:
+                old = base['guess latency (ms)'][percentile]
+                new = result['guess latency (ms)'][percentile]
+                if new > old * (1 + LATENCY_TOLERANCE) + LATENCY_SLACK_MS:
+                    regressions.append(f"{name}: {percentile} guess latency rose from {old} ms to {new} ms")
+    return regressions
+
+
+def load_baseline(filepath: str) -> dict:
+    """ Returns the baseline in the given file, or None if there isn't one """
+    if not os.path.exists(filepath):
+        return None
+    with open(filepath, 'r') as file:
+        return json.load(file)
+
+
+def save_baseline(filepath: str, results: dict, baseline: dict=None):
+    """ Writes the results to the baseline file. Results of agents and suites that
+        weren't run are kept from the previous baseline. """
+    merged = baseline['results'] if baseline is not None else dict()
+    for agent_type, suites in results.items():
+        merged.setdefault(agent_type, dict()).update(suites)
+    baseline = {
+        # Latency is only comparable on the same machine
+        'machine': {'python': platform.python_version(), 'platform': platform.platform(),
+                    'processor': platform.processor(), 'cpus': os.cpu_count()},
+        'results': merged,
+    }
+    # Write to a temporary file first, so an interrupted write can't corrupt the baseline
+    DataCache.write_atomic(filepath, lambda file: json.dump(baseline, file, indent=2), os.path.dirname(filepath), 'w')
+
+
+def print_how_to():
+    print("Run the benchmark like so:")
+    print("$ python Benchmark.py [options]")
+    print("Options:")
+    print("    --agents A,B    - The agent types to run (default all)")
+    print("    --suites S,T    - The suites to run (easy, hard, random, full; default all)")
+    print("    --length N      - The number of games in the easy, hard and random suites")
+    print("                      (default", BENCHMARK_LENGTH, end=")\n")
+    print("    --baseline FILE - The baseline file (default", BASELINE_FILE, end=")\n")
+    print("    --update        - Write the results to the baseline file instead of")
+    print("                      comparing them. The first run always writes the baseline")
+
+
+def parse_options(args: list[str]) -> dict:
+    """ Returns a dictionary of the options in the given arguments, or None if an
+        option is invalid. Options that aren't given have their default value. """
+    options = {'agents': list(AGENT_TYPES), 'suites': list(BENCHMARK_SUITES),
+               'length': BENCHMARK_LENGTH, 'baseline': BASELINE_FILE, 'update': False}
+    i = 0
+    while i < len(args):
+        if args[i] == '--agents' and i + 1 < len(args):
+            options['agents'] = args[i + 1].split(',')
+            i += 2
+        elif args[i] == '--suites' and i + 1 < len(args):
+            options['suites'] = args[i + 1].split(',')
+            i += 2
+        elif args[i] == '--length' and i + 1 < len(args) and args[i + 1].isdigit():
+            options['length'] = int(args[i + 1])
+            i += 2
+        elif args[i] == '--baseline' and i + 1 < len(args):
+            options['baseline'] = args[i + 1]
+            i += 2
+        elif args[i] == '--update':
+            options['update'] = True
+            i += 1
+        else:
+            print("Unknown option:", args[i])
+            return None
+    if (any(agent_type not in AGENT_TYPES for agent_type in options['agents'])
+        or any(suite not in BENCHMARK_SUITES for suite in options['suites'])
+        or options['length'] < 1):
+        return None
+    return options
+
+
+def main() -> int:
+    options = parse_options(sys.argv[1:])
+    if options is None:
+        print_how_to()
+        return 2
+
+    results = run_benchmark(options['agents'], options['suites'], options['length'], BENCHMARK_SEED)
+    baseline = load_baseline(options['baseline'])
+    if options['update'] or baseline is None:
+        save_baseline(options['baseline'], results, baseline)
+        print("Baseline written to", options['baseline'])
+        return 0
+
+    regressions = find_regressions(results, baseline['results'])
+    if regressions:
+        print("Regressions:")
+        for regression in regressions:
+            print("   ", regression)
+        return 1
+    print("No regressions.")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
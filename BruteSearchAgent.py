@@ -1,92 +1,160 @@
-from constants import WORD_LENGTH, PRECISION
+from constants import WORD_LENGTH, PRECISION, ALPHABET, HARD_MODE
 from SearchAgent import SearchAgent
+from SharedData import SharedVocab, get_shared_vocab, get_probability_overrides
+from FeedbackMatrix import ratings_to_pattern
+from GuessMemo import GuessMemo
+from ConstraintState import ConstraintState
+import DataProcessing
 
 from collections import Counter
-import queue
-import copy
+import numpy as np
 
 
 class BruteSearchAgent(SearchAgent):
     """ A BruteSearchAgent must be instantiated with a vocabulary of words it can guess, 
         and a letter probability distribution (a list of Counters), from which it 
         calculates its guesses. A new agent should be instantiated for each game, as 
-        the vocab and probability distribution are adjusted each search. """
-    def __init__(self, vocab: set, letter_probability_distribution: list[Counter]):
-        # Words that can be guessed
-        self.vocab = set(vocab)
+        the vocab and probability distribution are adjusted each search. The given vocab
+        and distribution are shared, and only the agent's changes to them are stored.
+        
+        If use_arrays is True, the vocab is scored with NumPy arrays instead of word
+        by word (see array_search). Both modes return the same guesses. If verbose is
+        False, the word by word search doesn't print the score of each guess. If a GuessMemo is given,
+        searches done by earlier games with the same feedback are reused. In hard mode,
+        every guess uses the hints so far (see ConstraintState.py). """
+    # Methods timed by a Profiler, and their phase names (see Profiler.py). Each search
+    # filters out the words which can't be the answer, and then scores the rest.
+    PROFILED_METHODS = SearchAgent.PROFILED_METHODS | {
+        'array_search': 'search',
+        'brute_force_search': 'search',
+        'filter_words': 'filter',
+        'is_possible': 'filter',
+        'score_words': 'score',
+        'score_word': 'score',
+    }
+    PROFILED_COUNTERS = ('words_scored',)
+    SHARED_ATTRIBUTES = ('vocab', 'words', 'word_codes', 'memo')
+
+    def __init__(self, vocab: set | SharedVocab, letter_probability_distribution: list[Counter], use_arrays: bool=True, verbose: bool=True, memo: GuessMemo=None, hard_mode: bool=HARD_MODE):
+        # Words that can be guessed (shared by every game)
+        self.vocab = get_shared_vocab(vocab)
         # List of adjusted letter probabilities
-        self.letter_probs = copy.deepcopy(letter_probability_distribution)
+        self.letter_probs = get_probability_overrides(letter_probability_distribution)
+        # Letters allowed at each position and letter counts, given the feedback so far
+        self.constraints = ConstraintState(hard_mode)
         # These letters are known to be in the word, but we don't know the position
         self.known_letters = Counter()
-        # Words to be removed from the vocab after iterating through the vocab
-        self.words_to_remove = set()
+        self.verbose = verbose
+        # Optional guesses of earlier games, keyed by feedback history
+        self.memo = memo
+        # Guesses and pattern codes of the feedback so far, and the number of guesses
+        # asked for
+        self.history = []
+        self.guess_count = 0
+        # Number of words scored by every search
+        self.words_scored = 0
+        self.use_arrays = use_arrays
+        if use_arrays:
+            # Words that can be guessed, in alphabetical order so ties are broken
+            # the same way as brute_force_search
+            self.words = self.vocab.words
+            # (N x WORD_LENGTH) array of letter indices for each word
+            self.word_codes = self.vocab.codes
+            # Mask of words that haven't been eliminated or guessed
+            self.remaining = np.ones(len(self.words), dtype=bool)
+        else:
+            # Words that have been eliminated or guessed
+            self.eliminated = set()
+            # Words to be removed from the vocab after iterating through the vocab
+            self.words_to_remove = set()
 
 
     # --- Define abstract methods
     # See SearchAgent.py
     def get_guess(self) -> str:
-        return self.brute_force_search()
+        self.guess_count += 1
+        if self.memo is None:
+            return self.search()
+        # The guess count tells apart searches after a guess was rejected
+        key = (tuple(self.history), self.guess_count)
+        entry = self.memo.get(key)
+        if entry is not None:
+            guess, words_left = entry
+            self.set_words_left(words_left)
+            return guess
+        guess = self.search()
+        self.memo.put(key, (guess, self.get_words_left()))
+        return guess
 
     # See SearchAgent.py
     def process_feedback(self, guess: str, letter_ratings: list[int]):
+        self.history.append((guess, ratings_to_pattern(letter_ratings)))
         self.adjust_letter_probs(guess, letter_ratings)
         
 
+    def search(self) -> str:
+        """ Returns the best word, and removes it and the impossible words from the
+            words left to guess """
+        if self.use_arrays:
+            return self.array_search()
+        return self.brute_force_search()
+
+
+    def get_words_left(self):
+        """ Returns a compact copy of the words left to guess, for the memo """
+        if self.use_arrays:
+            return np.packbits(self.remaining)
+        return frozenset(self.eliminated)
+
+    def set_words_left(self, words_left):
+        """ Sets the words left to guess to a copy made by get_words_left() """
+        if self.use_arrays:
+            self.remaining = np.unpackbits(words_left, count=len(self.words)).astype(bool)
+        else:
+            self.eliminated = set(words_left)
+
+
     def adjust_letter_probs(self, guess: str, letter_ratings: list[int]):
         """ Takes a guess and its corresponding ratings, and updates
             letter_probs for each character in the guess. """
+        self.constraints.update(guess, letter_ratings)
+        # Letters which can't be at a position have a probability of 0 there, and
+        # confirmed letters have a probability of 1
+        self.constraints.apply_to_letter_probs(self.letter_probs)
         # Track letters that are in the word, but we don't know the position
-        new_known_letters = Counter()
-        # Check every char and corresponding rating
-        for i, rating in enumerate(letter_ratings):
-            char = guess[i]
-            # If letter is correct, set probability to 1
-            if rating == '2':
-                # If letter was known without position, remove it from the tracker
-                if char in self.known_letters:
-                    del self.known_letters[char]
-                # Set proability to 1
-                self.letter_probs[i][char] = 1
-            # If letter is known but in the wrong position, set prob to 0 and track it
-            elif rating == '1':
-                self.letter_probs[i][char] = 0
-                new_known_letters[char] += 1
-            # If letter is incorrect, set probability to 0
-            elif rating == '0':
-                self.letter_probs[i][char] = 0
-                # Adjust probabilities of other positions to 0
-                # ToDo: I'm not sure whether this accounts for all edge cases
-                # Make sure letter is not already known (without position)
-                if char not in new_known_letters:
-                    # Loop through tables for every char position
-                    for table in self.letter_probs:
-                        # Make sure letter is not already known (with position)
-                        if table[char] != 1:
-                            # Set probability to 0
-                            table[char] = 0
-        # Add new known letters to persistent list
-        for char, count in new_known_letters.items():
-            # Only add if the count in the new list is greater
-            # E.g., if the letter was not previously known, or if only 1 was known,
-            # but now there are 2.
-            if count > self.known_letters[char]:
-                # Update count
-                self.known_letters[char] = count
+        self.known_letters = self.constraints.get_unplaced_counts()
 
 
     def get_score(self, word: str) -> float:
         """ Returns a word score equal to the sum of the probability of each letter
-            being in its respective position. """
+            being in its respective position. Words which can't be the answer have a
+            score of 0. """
+        if not self.is_possible(word):
+            # Remove word from vocab after iterating through it
+            self.words_to_remove.add(word)
+            return 0
+        return self.score_word(word)
+
+
+    def is_possible(self, word: str) -> bool:
+        """ Returns true if the word fits the feedback so far. If any letter prob is 0,
+            the word can't be the answer either. """
+        if not self.constraints.is_consistent(word):
+            return False
+        for i, char in enumerate(word):
+            if self.letter_probs[i][char] == 0:
+                return False
+        return True
+
+
+    def score_word(self, word: str) -> float:
+        """ Returns the score of a word which can be the answer (see get_score) """
+        self.words_scored += 1
         score = 0
         # For each character
         for i, char in enumerate(word):
             # Get probability
             prob = self.letter_probs[i][char]
-            # If any letter prob is 0, then the entire word score is 0
-            if prob == 0:
-                # Remove word from vocab after iterating through it
-                self.words_to_remove.add(word)
-                return 0
             
             # Increase probability if letter is known
             factor = 1/WORD_LENGTH # chance to be in that position
@@ -103,25 +171,89 @@ class BruteSearchAgent(SearchAgent):
     def brute_force_search(self):
         """ Scores every word in the vocab based on the sum of letter probabilities, 
             and then returns the word with the best score """
-        # Use priority queue to get best word quickly
-        rated_words = queue.PriorityQueue()
-        # Rate every word in vocab
+        # Rate every word in vocab, keeping the best (lowest negative score, then
+        # first alphabetically)
+        best_score, best_word = None, None
+        hard_mode = self.constraints.hard_mode
         for word in self.vocab:
-            score = self.get_score(word)
-            # Use negative score because PriorityQueue is a min heap
-            rated_words.put((-score, word))
-            
+            if word in self.eliminated:
+                continue
+            # In hard mode, skip words which don't use the hints so far
+            if hard_mode and not self.constraints.is_valid_guess(word):
+                continue
+            rating = (-self.get_score(word), word)
+            if best_word is None or rating < (best_score, best_word):
+                best_score, best_word = rating
             
         # Remove impossible words which have a score of 0 from vocab
-        self.vocab -= self.words_to_remove
+        self.eliminated |= self.words_to_remove
         self.words_to_remove.clear()
-        # Get best word from priority queue
-        best_score, best_word = rated_words.get()
+        # No words left to guess
+        if best_word is None:
+            return None
 
         # TESTING
-        print("Best Score:", -best_score)
+        if self.verbose:
+            print("Best Score:", -best_score)
 
         # Remove word from vocab to prevent repetition
-        self.vocab.discard(best_word)
+        self.eliminated.add(best_word)
         return best_word
 
+
+    def array_search(self):
+        """ Equivalent to brute_force_search, but every word is scored at once using
+            a table of letter probabilities indexed by the encoded vocab """
+        if not self.remaining.any():
+            return None
+        # Probability of each letter in each word
+        prob_table = DataProcessing.get_letter_prob_table(self.letter_probs)
+        probs = prob_table[np.arange(WORD_LENGTH), self.word_codes]
+        possible = self.filter_words(probs)
+        indices = np.flatnonzero(possible)
+
+        if len(indices) > 0:
+            scores = self.score_words(probs[indices], indices)
+            # Scores are compared after rounding, so every word close to the maximum
+            # is a candidate. The first word with the best rounded score is guessed
+            candidates = np.flatnonzero(scores >= scores.max() - 10 ** -PRECISION)
+            best = max(candidates, key=lambda i: (round(float(scores[i]), PRECISION), -i))
+            best_index = indices[best]
+        else:
+            # Every remaining word has a score of 0, so guess the first one (which
+            # uses the hints so far, in hard mode)
+            remaining = np.flatnonzero(self.remaining)
+            valid = [i for i in remaining if self.constraints.is_valid_guess(self.words[i])]
+            if not valid:
+                return None
+            best_index = valid[0]
+
+        # Remove impossible words, and remove guess to prevent repetition
+        self.remaining = possible
+        self.remaining[best_index] = False
+        return self.words[best_index]
+
+
+    def filter_words(self, probs: np.ndarray) -> np.ndarray:
+        """ Returns a mask of the words left which can be the answer, given the
+            probability of each letter of every word. Words with any letter prob of 0
+            are impossible, as are words which don't fit the letter counts (only checked
+            for the words left). """
+        possible = self.remaining & (probs != 0).all(axis=1)
+        indices = np.flatnonzero(possible)
+        possible[indices] = self.constraints.get_consistent_mask(self.word_codes[indices])
+        return possible
+
+
+    def score_words(self, probs: np.ndarray, indices: np.ndarray) -> np.ndarray:
+        """ Returns the scores of the words at the given indices, given the probability
+            of each of their letters (see get_score) """
+        self.words_scored += len(indices)
+        # Boost the probability of known letters
+        boosts = (1/WORD_LENGTH) * np.array([self.known_letters[char] for char in ALPHABET])
+        probs = probs + boosts[self.word_codes[indices]]
+        # Sum position by position to match the floating point result of get_score
+        scores = probs[:, 0]
+        for i in range(1, WORD_LENGTH):
+            scores = scores + probs[:, i]
+        return scores
@@ -1,9 +1,14 @@
 
 import functools
 import time
-from ReportDataCollector import ReportDataCollector
+import FeedbackMatrix
+import DataProcessing
+from Profiler import Profiler
+from ConstraintState import ConstraintState
+
+from constants import MAX_GUESS_COUNT, WORD_LENGTH, ALPHABET, GUESSES_FILE, SOLUTIONS_FILE, HARD_MODE
+import numpy as np
 
-from constants import MAX_GUESS_COUNT
 
 class LetterInfo:
     def __init__(self, letter, position):
@@ -59,39 +64,70 @@ class GuessStatus:
         self.gray.add(letter)
         self.update_use(letter)
 
-class Dictionary:
-    def __init__(self):
+class Corpus:
+    """ Word lists and letter frequencies shared by every game. The corpus is loaded once
+        per process (see get_corpus) and is never modified; per-game state is kept in
+        Dictionary. The word lists are packed (N x WORD_LENGTH) arrays of ASCII letters
+        mapped from the cache, so no Python object is made for each word, and a word is
+        only decoded when it's guessed (see get_answer). """
+    def __init__(self, guesses_file, answers_file):
+        self.guesses = self.get_words_from_file(guesses_file)
+        self.answers = self.get_words_from_file(answers_file)
+        # (N x WORD_LENGTH) array of letter indices of the answers, for filtering
+        self.answer_codes = self.answers - ord('A')
 
-        self.feedback = GuessStatus()
+        self.frequency = self.generate_letter_frequency(self.answer_codes)
 
-        self.guesses = self.get_words_from_file('Data/valid_guesses.csv')
-        self.answers = self.get_words_from_file('Data/valid_solutions.csv')
+    def get_words_from_file(self, filename):
+        # Map the packed copy of the file, which is converted on first use
+        return DataProcessing.import_packed_lexicon(filename)
 
-        self.frequency = self.generate_letter_frequency(self.answers)
-    #    self.word_scores = self.calculate_word_scores(self.guesses + self.answers, False)
+    def get_answer(self, index):
+        """ Returns the answer at the given index as a string """
+        return self.answers[index].tobytes().decode('ascii')
 
-        # Stats
-        self.guess_durations = []
+    def generate_letter_frequency(self, answer_codes):
+        """ Returns a LetterInfo for each letter in the answers, counted a position at a
+            time from the encoded answers """
+        counts = np.array([np.bincount(answer_codes[:, i], minlength=len(ALPHABET)) for i in range(WORD_LENGTH)])
+        frequency = dict()
+        for index, letter in enumerate(ALPHABET):
+            if counts[:, index].sum() == 0:
+                continue
+            lett = LetterInfo(letter, 0)
+            lett.by_position = {position: int(count) for position, count in enumerate(counts[:, index])}
+            # total counts the occurrences after the first, like LetterInfo.add
+            lett.total = int(counts[:, index].sum()) - 1
+            frequency[letter] = lett
+        return frequency
 
-    def get_words_from_file(self, filename):
-        word_arr = []
-        with open(filename, 'r') as words:
-            for word in words:
-                word_arr.append(word.strip().upper())
+@functools.lru_cache(maxsize=None)
+def get_corpus():
+    """ Returns the corpus of the data files, loading it the first time """
+    return Corpus(GUESSES_FILE, SOLUTIONS_FILE)
 
-        return word_arr
+class Dictionary:
+    # Methods timed by a Profiler, and their phase names (see Profiler.py)
+    PROFILED_METHODS = {'get_next_guess': 'guess', 'update_candidates': 'filter'}
 
-    def generate_letter_frequency(self, answers):
+    def __init__(self, corpus=None, hard_mode: bool=HARD_MODE):
+        # Shared word lists, loaded once per process
+        self.corpus = corpus if corpus is not None else get_corpus()
 
-        frequency = dict()
-        for word in answers:
-            for position, letter in enumerate(word):
-                if letter not in frequency:
-                    frequency[letter] = LetterInfo(letter, position)
-                else:
-                    lett = frequency[letter]
-                    lett.add(position)
-        return frequency
+        self.feedback = GuessStatus()
+        # Letter counts and the letters allowed at each position, which the answers
+        # are filtered with (see ConstraintState.py). Guesses are always possible
+        # answers, which are valid guesses in hard mode too
+        self.constraints = ConstraintState(hard_mode)
+
+        # Indices of the corpus answers that are still possible
+        self.candidates = np.arange(len(self.corpus.answers))
+
+        self.frequency = self.corpus.frequency
+    #    self.word_scores = self.calculate_word_scores(self.corpus.guesses + self.corpus.answers, False)
+
+        # Stats
+        self.guess_durations = []
 
     def get_word_score(self, word, by_position = True):
 
@@ -118,39 +154,12 @@ class Dictionary:
         sorted_word_dict = sorted(word_dict.items(), key = lambda item: item[1], reverse = True)
         return sorted_word_dict
 
-    def register_guess(self, guess):
-        if guess in self.answers:
-            self.answers.remove(guess)
-        if guess in self.guesses:
-            self.guesses.remove(guess)
-
-    def filter_answers(self, word):
-        # Remove words that have yellow letters in yellow spots         
-        for position, letters in self.feedback.yellow.items():
-            for letter in letters:
-                if letter not in word or word[position] == letter:
-                    return False
-        
-        # Remove words that have gray letters
-        for letter in self.feedback.gray:
-            if letter in word:
-                return False
-            
-        # Remove words that don't have green letters in green spots
-        for position, letter in self.feedback.green.items():
-            if word[position] != letter:
-                return False
-
-        return True
-
-    def update_answers(self, answers):
-        filtered_word = list()
-
-        for i in range(len(answers)):
-            if(self.filter_answers(answers[i]) == True):
-                filtered_word.append(answers[i])
-
-        return filtered_word
+    def update_candidates(self):
+        """ Removes candidates that don't satisfy the feedback. Every candidate is checked
+            at once on the encoded answers. Guessed words are removed too, since a word
+            that isn't the answer doesn't satisfy its own feedback. """
+        mask = self.constraints.get_consistent_mask(self.corpus.answer_codes[self.candidates])
+        self.candidates = self.candidates[mask]
     
     def get_next_guess(self):
 
@@ -161,18 +170,30 @@ class Dictionary:
             return
         
         # always update answers first
-        self.answers = self.update_answers(self.answers)
+        self.update_candidates()
 
         # Record time
         guess_duration = time.process_time() - start_time
         self.guess_durations.append(guess_duration)
         
         # first word in answers    
-        return self.answers[0]
+        return self.corpus.get_answer(self.candidates[0])
 
 class CSPSolver:
-    def __init__(self, target):
-        self.dictionary = Dictionary()
+    # Methods timed by a Profiler, and their phase names (see Profiler.py)
+    PROFILED_METHODS = {'get_letter_ratings': 'feedback', 'generate_feedback': 'update'}
+    PROFILED_PARTS = ('dictionary',)
+
+    def __init__(self, target, feedback_matrix: FeedbackMatrix.FeedbackMatrix=None, profiler: Profiler=None, verbose: bool=True, hard_mode: bool=HARD_MODE):
+        self.dictionary = Dictionary(hard_mode=hard_mode)
+        # Print the guesses of each game
+        self.verbose = verbose
+        # Optional precomputed feedback patterns used to rate guesses
+        self.feedback_matrix = feedback_matrix
+        # Optional instrumentation of the game (see Profiler.py)
+        self.profiler = profiler
+        if profiler is not None:
+            profiler.instrument(self)
         # Stats
         self.guess_durations = self.dictionary.guess_durations
 
@@ -192,18 +213,29 @@ class CSPSolver:
     def getDataCollector(self):
         return self.dataCollector
 
+    def get_letter_ratings(self, guess):
+        """ Returns the game's letter ratings for the guess (see FeedbackMatrix.get_letter_ratings) """
+        if self.feedback_matrix is not None:
+            return self.feedback_matrix.get_letter_ratings(guess, self.target)
+        return FeedbackMatrix.get_letter_ratings(guess, self.target)
+
     def generate_feedback(self, guess):
+        letter_ratings = self.get_letter_ratings(guess)
+        # letters rated green or yellow somewhere in the guess
+        found = {letter for letter, rating in zip(guess, letter_ratings) if rating != '0'}
         for (index, letter) in enumerate(guess):
-            if letter in self.target:
-                if self.target[index] == letter:
-                    # letter is in correct position: green
-                    self.dictionary.feedback.update_green(letter, index)
-                else:
-                    # letter is not in the correct position: yellow
-                    self.dictionary.feedback.update_yellow(letter, index)
+            if letter_ratings[index] == '2':
+                # letter is in correct position: green
+                self.dictionary.feedback.update_green(letter, index)
+            elif letter_ratings[index] == '1' or letter in found:
+                # letter is not in the correct position: yellow
+                # (a gray repeat of a found letter only rules out this position)
+                self.dictionary.feedback.update_yellow(letter, index)
             else:
                 # letter is not in the word: gray
                 self.dictionary.feedback.update_gray(letter)
+        # record the letter counts and positions the ratings allow
+        self.dictionary.constraints.update(guess, letter_ratings)
     
     def test(self, starting_word = "SALET"):
         """ Runs solver and returns dictionary of statistics """
@@ -216,7 +248,6 @@ class CSPSolver:
         while not self.is_solved:
             # Keep track of words and letters guessed
             self.guess_list.append(guess)
-            self.dictionary.register_guess(guess)
 
             if guess == self.target:
                 self.is_solved = True
@@ -229,11 +260,12 @@ class CSPSolver:
         self.guess_count = len(self.guess_list)
         self.answer = self.guess_list[-1]
 
-        print(self.answer, self.guess_count, self.guess_list)
-        if(self.guess_count <= MAX_GUESS_COUNT):
-            print(self.answer, " is correct! You win!")
-        else:
-            print(self.answer, " is correct! But, turn is over. You lose!")
+        if self.verbose:
+            print(self.answer, self.guess_count, self.guess_list)
+            if(self.guess_count <= MAX_GUESS_COUNT):
+                print(self.answer, " is correct! You win!")
+            else:
+                print(self.answer, " is correct! But, turn is over. You lose!")
 
         # Record game time
         game_duration = time.process_time() - start_time
@@ -258,7 +290,8 @@ class CSPSolver:
         # Check if game was successfuly solved
         successful = self.is_solved and self.guess_count <= MAX_GUESS_COUNT
 
-        self.dataCollector.recordData([ guess, self.guess_count, successful, avg_guess_time, game_duration ])
+        profile = self.profiler.get_row() if self.profiler is not None else None
+        self.dataCollector.recordData([ guess, self.guess_count, successful, avg_guess_time, game_duration ], profile)
 
         #return data_row
         return []    
@@ -0,0 +1,205 @@
+from constants import ALPHABET, WORD_LENGTH, HARD_MODE
+
+from collections import Counter
+import functools
+import numpy as np
+
+
+def get_letter_mask(word):
+    """ Returns a 26-bit mask with a bit set for each letter in the word (A is bit 0) """
+    mask = 0
+    for letter in word:
+        mask |= 1 << (ord(letter) - ord('A'))
+    return mask
+
+def get_position_bit(position, letter):
+    """ Returns the bit of the letter at the position in a position mask """
+    return 1 << (len(ALPHABET) * position + ord(letter) - ord('A'))
+
+def get_position_mask(word):
+    """ Returns a (26 * WORD_LENGTH)-bit mask with a bit set for each letter in the word
+        at its position (see get_position_bit) """
+    mask = 0
+    for position, letter in enumerate(word):
+        mask |= get_position_bit(position, letter)
+    return mask
+
+@functools.lru_cache(maxsize=None)
+def get_word_masks(word):
+    """ Returns the letter mask and position mask of the word. Masks are computed once
+        per word and reused by every game. """
+    return get_letter_mask(word), get_position_mask(word)
+
+
+class ConstraintState:
+    """ What the feedback so far says about the answer: the letters each position can
+        still hold, and the fewest and most copies of each letter. Repeated letters are
+        handled exactly, e.g. if a guess with two E's gets one yellow E and one gray E,
+        the answer has exactly one E, and it isn't at either of those positions.
+
+        In hard mode, every guess must use the hints revealed so far: green letters
+        must stay in place, and every letter found must be used (see is_valid_guess). """
+    def __init__(self, hard_mode: bool=HARD_MODE):
+        self.hard_mode = hard_mode
+        # Letters which can be at each position
+        self.allowed = [set(ALPHABET) for _ in range(WORD_LENGTH)]
+        # Letters known to be at a position (green). The key is the position and the
+        # value is the letter
+        self.green = dict()
+        # Fewest copies of each letter in the answer
+        self.min_count = Counter()
+        # Most copies of each letter, known once a guess has more copies than the
+        # answer (a copy is gray). Other letters can fill every position
+        self.max_count = dict()
+        # Predicates compiled from the constraints, built on first use after the
+        # constraints change (see is_consistent and is_valid_guess)
+        self.consistent_filter = None
+        self.guess_filter = None
+
+
+    def update(self, guess: str, letter_ratings: list[str]):
+        """ Adds the constraints given by the letter ratings of the guess """
+        # Copies of each letter rated green or yellow, and letters with a gray copy
+        found = Counter()
+        gray = set()
+        for i, (char, rating) in enumerate(zip(guess, letter_ratings)):
+            if rating == '2':
+                self.green[i] = char
+                self.allowed[i] = {char}
+                found[char] += 1
+            else:
+                # Yellow and gray letters aren't at this position
+                self.allowed[i].discard(char)
+                if rating == '1':
+                    found[char] += 1
+                else:
+                    gray.add(char)
+        for char in set(guess):
+            if found[char] > self.min_count[char]:
+                self.min_count[char] = found[char]
+            # A gray copy means the answer has no more copies than were found
+            if char in gray:
+                self.max_count[char] = found[char]
+        # Once every copy of a letter is green, it can't be anywhere else
+        green_counts = Counter(self.green.values())
+        for char, max_count in self.max_count.items():
+            if green_counts[char] >= max_count:
+                for i in range(WORD_LENGTH):
+                    if self.green.get(i) != char:
+                        self.allowed[i].discard(char)
+        self.consistent_filter = None
+        self.guess_filter = None
+
+
+    def get_unplaced_counts(self) -> Counter:
+        """ Returns the number of copies of each letter that are known to be in the
+            answer, but not where """
+        return self.min_count - Counter(self.green.values())
+
+
+    def apply_to_letter_probs(self, letter_probs: list):
+        """ Sets the probability of every letter which can't be at a position to 0, and
+            of green letters to 1, in the given list of probability tables (one per
+            position) """
+        for i, table in enumerate(letter_probs):
+            allowed = self.allowed[i]
+            if i in self.green:
+                table[self.green[i]] = 1
+            for char in ALPHABET:
+                if char not in allowed and table[char] != 0:
+                    table[char] = 0
+
+
+    def compile_filter(self):
+        """ Returns a function which takes a word and returns True if it could be the
+            answer. The constraints are combined into bitmasks, so most words are
+            accepted or rejected with a few bitwise operations. """
+        # Letters at positions they can't be at
+        disallowed = 0
+        for i, allowed in enumerate(self.allowed):
+            for char in ALPHABET:
+                if char not in allowed:
+                    disallowed |= get_position_bit(i, char)
+        # Letters that must be in the word
+        required = get_letter_mask(char for char, count in self.min_count.items() if count > 0)
+        # Letter counts that the masks can't check (repeated or limited letters)
+        counts = [(char, self.min_count[char], self.max_count.get(char, WORD_LENGTH))
+                  for char in set(self.min_count) | set(self.max_count)
+                  if self.min_count[char] > 1 or 0 < self.max_count.get(char, WORD_LENGTH) < WORD_LENGTH]
+
+        def is_consistent(word):
+            letter_mask, position_mask = get_word_masks(word)
+            if position_mask & disallowed or letter_mask & required != required:
+                return False
+            for char, min_count, max_count in counts:
+                if not min_count <= word.count(char) <= max_count:
+                    return False
+            return True
+
+        return is_consistent
+
+
+    def compile_guess_filter(self):
+        """ Returns a function which takes a word and returns True if it can be guessed
+            in hard mode: green letters are in place, and found letters are used as
+            many times as they were found """
+        green = 0
+        for i, char in self.green.items():
+            green |= get_position_bit(i, char)
+        required = get_letter_mask(char for char, count in self.min_count.items() if count > 0)
+        repeated = [(char, count) for char, count in self.min_count.items() if count > 1]
+
+        def is_valid_guess(word):
+            letter_mask, position_mask = get_word_masks(word)
+            if position_mask & green != green or letter_mask & required != required:
+                return False
+            for char, min_count in repeated:
+                if word.count(char) < min_count:
+                    return False
+            return True
+
+        return is_valid_guess
+
+
+    def is_consistent(self, word: str) -> bool:
+        """ Returns true if the word could be the answer """
+        if self.consistent_filter is None:
+            self.consistent_filter = self.compile_filter()
+        return self.consistent_filter(word)
+
+
+    def is_valid_guess(self, word: str) -> bool:
+        """ Returns true if the word can be guessed. Any word can be guessed unless
+            hard mode is on. Every word that could be the answer is a valid guess. """
+        if not self.hard_mode:
+            return True
+        if self.guess_filter is None:
+            self.guess_filter = self.compile_guess_filter()
+        return self.guess_filter(word)
+
+
+    def get_consistent_mask(self, word_codes: np.ndarray) -> np.ndarray:
+        """ Returns a boolean array which is True for each word that could be the answer,
+            given the (N x WORD_LENGTH) array of letter indices of the words (see
+            DataProcessing.encode_words) """
+        mask = np.ones(len(word_codes), dtype=bool)
+        # Check the letter at each position that doesn't allow every letter
+        for i, allowed in enumerate(self.allowed):
+            if len(allowed) < len(ALPHABET):
+                allowed_table = np.array([char in allowed for char in ALPHABET])
+                mask &= allowed_table[word_codes[:, i]]
+        # Letter counts that the positions don't check (letters with no copies are
+        # already excluded from every position)
+        counts = [(ALPHABET.index(char), self.min_count[char], self.max_count.get(char, WORD_LENGTH))
+                  for char in set(self.min_count) | set(self.max_count)
+                  if self.min_count[char] > 0 or 0 < self.max_count.get(char, WORD_LENGTH) < WORD_LENGTH]
+        if counts:
+            # Only count the letters of the words that are left, which are usually few
+            indices = np.flatnonzero(mask)
+            codes = word_codes[indices]
+            consistent = np.ones(len(indices), dtype=bool)
+            for index, min_count, max_count in counts:
+                letter_counts = (codes == index).sum(axis=1)
+                consistent &= (letter_counts >= min_count) & (letter_counts <= max_count)
+            mask[indices] = consistent
+        return mask
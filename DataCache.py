@@ -0,0 +1,105 @@
+from constants import CACHE_DIR, FIRST_GUESS, WORD_LENGTH, PRECISION
+
+import hashlib
+import os
+import pickle
+import sys
+import tempfile
+import numpy as np
+
+
+# Increment when the format of cached data changes, to invalidate old caches
+CACHE_VERSION = 1
+
+
+def get_cache_key(filepaths: list[str]) -> str:
+    """ Returns a hash of the contents of the given files and the settings that the
+        preprocessed data depends on. Changing any of them gives a new key. """
+    digest = hashlib.sha256()
+    for filepath in filepaths:
+        with open(filepath, 'rb') as file:
+            digest.update(file.read())
+    digest.update(repr((FIRST_GUESS, WORD_LENGTH, PRECISION, CACHE_VERSION)).encode())
+    return digest.hexdigest()[:16]
+
+
+def get_code_key(key: str, modules: list[str]) -> str:
+    """ Returns the given cache key combined with a hash of the source code of the given
+        modules (which must already be imported). Data cached with this key is rebuilt
+        when the code that produces it changes. """
+    digest = hashlib.sha256(key.encode())
+    for module in modules:
+        with open(sys.modules[module].__file__, 'rb') as file:
+            digest.update(file.read())
+    return digest.hexdigest()[:16]
+
+
+def get_name_key(names: list[str]) -> str:
+    """ Returns a hash of the given names (e.g. file paths) and the settings, without
+        reading any files. A cache file with this key must check that it's up to date
+        itself (see DataProcessing.import_packed_lexicon). """
+    digest = hashlib.sha256(repr((list(names), FIRST_GUESS, WORD_LENGTH, CACHE_VERSION)).encode())
+    return digest.hexdigest()[:16]
+
+
+def get_cache_path(name: str, key: str, extension: str) -> str:
+    """ Returns the path of the cache file with the given name and key """
+    return os.path.join(CACHE_DIR, f"{name}_{key}.{extension}")
+
+
+def write_atomic(path: str, write, directory: str=CACHE_DIR, mode: str='wb'):
+    """ Calls write(file) on a temporary file in the given directory (which is created
+        if needed, and must be the directory of path) and then moves it to path, so an
+        interrupted write never leaves a partial file. Each call writes its own
+        temporary file, so processes that write the same file at once don't interfere,
+        and the last one to finish wins. The file is opened with the given mode. """
+    directory = directory or '.'
+    os.makedirs(directory, exist_ok=True)
+    handle, temp_path = tempfile.mkstemp(dir=directory, prefix=os.path.basename(path) + '.', suffix='.tmp')
+    try:
+        with os.fdopen(handle, mode) as file:
+            write(file)
+        os.replace(temp_path, path)
+    except BaseException:
+        try:
+            os.remove(temp_path)
+        except OSError:
+            pass
+        raise
+
+
+def load_data(name: str, key: str) -> dict:
+    """ Returns the cached dictionary with the given name and key, or None if it
+        isn't cached """
+    path = get_cache_path(name, key, 'pkl')
+    if not os.path.exists(path):
+        return None
+    try:
+        with open(path, 'rb') as file:
+            return pickle.load(file)
+    except (OSError, pickle.UnpicklingError, EOFError):
+        print("Warning: cache file", path, "could not be read, and was ignored.")
+        return None
+
+
+def save_data(name: str, key: str, data: dict):
+    """ Caches the given dictionary with the given name and key """
+    write_atomic(get_cache_path(name, key, 'pkl'),
+                 lambda file: pickle.dump(data, file, protocol=pickle.HIGHEST_PROTOCOL))
+
+
+def load_array(name: str, key: str) -> np.ndarray:
+    """ Returns the cached array with the given name and key, or None if it isn't cached """
+    path = get_cache_path(name, key, 'npy')
+    if not os.path.exists(path):
+        return None
+    try:
+        return np.load(path)
+    except (OSError, ValueError):
+        print("Warning: cache file", path, "could not be read, and was ignored.")
+        return None
+
+
+def save_array(name: str, key: str, array: np.ndarray):
+    """ Caches the given array with the given name and key """
+    write_atomic(get_cache_path(name, key, 'npy'), lambda file: np.save(file, array))
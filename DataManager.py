@@ -1,13 +1,25 @@
+import os
 import random
 
 import DataProcessing
+import DataCache
+from FeedbackMatrix import FeedbackMatrix
+from DecisionTree import DecisionTree, build_decision_tree
 from StartWordFinder import StartWordFinder
-from constants import FIRST_GUESS
+from SharedData import SharedVocab, SharedArrays, attach_arrays
+from constants import FIRST_GUESS, LEXICON_FILE, SOLUTIONS_FILE, ORDERED_SOLUTIONS_FILE
+
+# Modules whose code produces each kind of cached data
+CACHED_DATA_MODULES = {
+    'data': ['DataProcessing', 'StartWordFinder'],
+    'feedback': ['FeedbackMatrix'],
+    'decision_tree': ['FeedbackMatrix', 'DecisionTree'],
+}
 
 class DataManager:
     """ This class manages data that is initialized when starting the program 
         and then used every game. """
-    def __init__(self):
+    def __init__(self, data: dict=None):
         # All words that can be guessed (including possible answers)
         self.guess_words = set()
         # Words that can be answers (subset of guess_words)
@@ -18,26 +30,151 @@ class DataManager:
         self.letter_probs = []
         # Sequence of words to guess first
         self.start_words = list()
-        self.set_data()
+        # Guess words and answer words in alphabetical order, and the corresponding
+        # arrays of letter indices (see DataProcessing.encode_words)
+        self.guess_word_list = []
+        self.answer_word_list = []
+        self.guess_codes = None
+        self.answer_codes = None
+        # Answer words and guess words shared by search agents (see SharedData.SharedVocab)
+        self.answer_vocab = None
+        self.guess_vocab = None
+        # Hash of the data files and settings. Each kind of cached data is keyed by
+        # this and the source of the modules that produce it (see get_cache_key)
+        self.cache_key = DataCache.get_cache_key([LEXICON_FILE, SOLUTIONS_FILE, ORDERED_SOLUTIONS_FILE])
+        # Precomputed feedback for every guess word against every answer word.
+        # Built on first use, see get_feedback_matrix()
+        self.feedback_matrix = None
+        # Precomputed tree of guesses, built on first use, see get_decision_tree()
+        self.decision_tree = None
+        self.set_data(data)
         
-    def set_data(self):
-        """ Sets internal word sets from file and calculates letter probabilities """
+    def set_data(self, data: dict=None):
+        """ Sets internal word sets from the given preprocessed data if any, otherwise
+            from the cache if the data files haven't changed, otherwise preprocesses
+            the data files and caches the result """
+        if data is None:
+            data = DataCache.load_data('data', self.get_cache_key('data'))
+        if data is None:
+            data = self.preprocess()
+            DataCache.save_data('data', self.get_cache_key('data'), data)
+        # Set attributes from data
+        for name, value in data.items():
+            setattr(self, name, value)
+        # Answer words and guess words shared by every agent
+        self.answer_vocab = SharedVocab(self.answer_word_list, self.answer_codes)
+        self.guess_vocab = SharedVocab(self.guess_word_list, self.guess_codes)
+
+    def get_cache_key(self, name: str) -> str:
+        """ Returns the key of the cached data with the given name, which changes when
+            the data files, the settings or the code that produces the data change """
+        return DataCache.get_code_key(self.cache_key, CACHED_DATA_MODULES[name])
+
+    def preprocess(self) -> dict:
+        """ Reads word sets from file and calculates letter probabilities. Returns
+            a dictionary of the resulting attributes. """
         # Set data from file
-        self.guess_words = DataProcessing.import_lexicon('Data/wordle_lexicon.txt')
-        self.answer_words = DataProcessing.import_lexicon('Data/valid_solutions.csv')
-        self.answer_words_ordered = DataProcessing.import_lexicon_as_list('Data/valid_solutions_ordered.csv')
+        guess_words = DataProcessing.import_lexicon(LEXICON_FILE)
+        answer_words = DataProcessing.import_lexicon(SOLUTIONS_FILE)
+        answer_words_ordered = DataProcessing.import_lexicon_as_list(ORDERED_SOLUTIONS_FILE)
         
         # Calculate letter probabilities with respect to each position in the word
-        self.letter_probs = DataProcessing.calculate_letter_probability_distribution(self.answer_words)
+        letter_probs = DataProcessing.calculate_letter_probability_distribution(answer_words)
         
         # Determine sequence of initial guesses using StartWordFinder
-        general_letter_probs = DataProcessing.get_general_letter_probabilities(list(self.answer_words))
-        word_finder = StartWordFinder(self.guess_words, general_letter_probs)
-        self.start_words = word_finder.get_start_words(FIRST_GUESS)
+        general_letter_probs = DataProcessing.get_general_letter_probabilities(list(answer_words))
+        word_finder = StartWordFinder(guess_words, general_letter_probs)
+        start_words = word_finder.get_start_words(FIRST_GUESS)
+
+        # Encode words as arrays
+        guess_word_list = sorted(guess_words)
+        answer_word_list = sorted(answer_words)
+        return {
+            'guess_words': guess_words,
+            'answer_words': answer_words,
+            'answer_words_ordered': answer_words_ordered,
+            'letter_probs': letter_probs,
+            'start_words': start_words,
+            'guess_word_list': guess_word_list,
+            'answer_word_list': answer_word_list,
+            'guess_codes': DataProcessing.encode_words(guess_word_list),
+            'answer_codes': DataProcessing.encode_words(answer_word_list),
+        }
+
+    def get_feedback_matrix(self) -> FeedbackMatrix:
+        """ Returns the feedback matrix of guess words against answer words, building it
+            the first time it is needed. Rows and columns are in alphabetical order.
+            The patterns are cached on disk alongside the other preprocessed data. """
+        if self.feedback_matrix is None:
+            patterns = DataCache.load_array('feedback', self.get_cache_key('feedback'))
+            self.feedback_matrix = FeedbackMatrix(self.guess_word_list, self.answer_word_list, patterns)
+            if patterns is None:
+                DataCache.save_array('feedback', self.get_cache_key('feedback'), self.feedback_matrix.patterns)
+        return self.feedback_matrix
+
+    def get_decision_tree(self) -> DecisionTree:
+        """ Returns the decision tree of guesses for the answer words, reading it from the
+            cache, or building and caching it the first time it is needed """
+        if self.decision_tree is None:
+            path = DataCache.get_cache_path('decision_tree', self.get_cache_key('decision_tree'), 'npz')
+            if os.path.exists(path):
+                self.decision_tree = DecisionTree.load(path)
+            else:
+                print("Building decision tree...")
+                self.decision_tree = build_decision_tree(self.get_feedback_matrix())
+                DataCache.write_atomic(path, self.decision_tree.save)
+        return self.decision_tree
+
+    def share(self, shared_arrays: SharedArrays) -> dict:
+        """ Publishes the word arrays, and the feedback matrix and decision tree if they
+            have been built, in the given shared memory. Returns a small picklable dict
+            of everything else, from which worker processes rebuild the DataManager
+            without copying the arrays (see attach()). """
+        shared_arrays.publish('guess_codes', self.guess_codes)
+        shared_arrays.publish('answer_codes', self.answer_codes)
+        if self.feedback_matrix is not None:
+            shared_arrays.publish('feedback', self.feedback_matrix.patterns)
+        if self.decision_tree is not None:
+            for name in ('node_words', 'edge_offsets', 'edge_patterns', 'edge_children'):
+                shared_arrays.publish(name, getattr(self.decision_tree, name))
+        return {
+            'answer_words_ordered': self.answer_words_ordered,
+            'letter_probs': self.letter_probs,
+            'start_words': self.start_words,
+            'arrays': dict(shared_arrays.specs),
+        }
+
+    @staticmethod
+    def attach(state: dict) -> 'DataManager':
+        """ Returns a DataManager with the data shared by share(). Word sets are rebuilt
+            from the shared letter arrays, and the arrays themselves aren't copied. """
+        arrays = attach_arrays(state['arrays'])
+        guess_word_list = DataProcessing.decode_codes(arrays['guess_codes'])
+        answer_word_list = DataProcessing.decode_codes(arrays['answer_codes'])
+        data_manager = DataManager({
+            'guess_words': set(guess_word_list),
+            'answer_words': set(answer_word_list),
+            'answer_words_ordered': state['answer_words_ordered'],
+            'letter_probs': state['letter_probs'],
+            'start_words': state['start_words'],
+            'guess_word_list': guess_word_list,
+            'answer_word_list': answer_word_list,
+            'guess_codes': arrays['guess_codes'],
+            'answer_codes': arrays['answer_codes'],
+        })
+        if 'feedback' in arrays:
+            data_manager.feedback_matrix = FeedbackMatrix(guess_word_list, answer_word_list, arrays['feedback'])
+        if 'node_words' in arrays:
+            data_manager.decision_tree = DecisionTree(arrays['node_words'], arrays['edge_offsets'],
+                                                      arrays['edge_patterns'], arrays['edge_children'])
+        return data_manager
              
-    def get_random_answers(self, length: int) -> list:
-        """ Returns a list of the given length with random answer words. """
-        return random.sample(list(self.answer_words), length)
+    def get_random_answers(self, length: int, seed: int=None) -> list:
+        """ Returns a list of the given length with random answer words. If a seed is
+            given, the same words are returned every time. """
+        rng = random if seed is None else random.Random(seed)
+        # Sample from a sorted list, since the order of a set changes between runs
+        return rng.sample(sorted(self.answer_words), length)
 
     def get_specific_answers(self, length: int, test_mode: str) -> list:
         """ Return a list of the given length with easy and hard words. """
@@ -52,8 +189,8 @@ class DataManager:
         
         return sorted_list
 
-    def get_answers(self, length: int, test_mode:str) -> list:
+    def get_answers(self, length: int, test_mode:str, seed: int=None) -> list:
         if(test_mode == 'random'):
-            return self.get_random_answers(length)
+            return self.get_random_answers(length, seed)
         else:
             return self.get_specific_answers(length, test_mode)        
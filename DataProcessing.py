@@ -1,6 +1,17 @@
 from collections import Counter
+import os
+import struct
+import numpy as np
 
-from constants import WORD_LENGTH, PRECISION
+import DataCache
+from constants import WORD_LENGTH, PRECISION, ALPHABET
+
+
+# Header of a packed lexicon file: magic bytes, format version, word length, word count,
+# and the modification time (ns) and size of the text file it was converted from
+PACKED_HEADER = struct.Struct('<4sBBxxQqQ')
+PACKED_MAGIC = b'WLEX'
+PACKED_VERSION = 2
 
 
 
@@ -86,3 +97,105 @@ def get_general_letter_probabilities(words: list[str]) -> Counter:
         
     # char_counts now contains the counts divided by the total number of characters
     return char_counts
+
+
+def encode_words(words: list[str]) -> np.ndarray:
+    """ Returns an (N x WORD_LENGTH) uint8 array where each row is a word from the given
+        list, and each value is the index of the letter in the alphabet (A=0, ..., Z=25) """
+    # Every word is uppercase ASCII, so the bytes can be read as a single buffer
+    buffer = ''.join(words).encode('ascii')
+    codes = np.frombuffer(buffer, dtype=np.uint8).reshape(len(words), WORD_LENGTH)
+    return codes - ord('A')
+
+
+def get_letter_prob_table(letter_probs: list[Counter]) -> np.ndarray:
+    """ Returns a (WORD_LENGTH x 26) float array of the given letter probability
+        distribution, where table[i, j] is the probability of the j-th letter of the
+        alphabet being in position i """
+    table = np.zeros((WORD_LENGTH, len(ALPHABET)))
+    for i, probs in enumerate(letter_probs):
+        for j, char in enumerate(ALPHABET):
+            table[i, j] = probs[char]
+    return table
+
+
+def get_source_stat(filepath: str) -> tuple[int, int]:
+    """ Returns the modification time (ns) and size of the given file, which tell whether
+        a packed lexicon converted from it is up to date without reading it """
+    stat = os.stat(filepath)
+    return stat.st_mtime_ns, stat.st_size
+
+
+def write_packed_lexicon(words: list[str], file, source_stat: tuple[int, int]=(0, 0)):
+    """ Writes the given words to the given binary file object as a packed lexicon: a
+        header followed by the ASCII bytes of each word, with no separators. source_stat
+        identifies the text file the words were read from (see get_source_stat). """
+    file.write(PACKED_HEADER.pack(PACKED_MAGIC, PACKED_VERSION, WORD_LENGTH, len(words), *source_stat))
+    file.write(''.join(words).encode('ascii'))
+
+
+def read_packed_header(filepath: str) -> tuple[int, tuple[int, int]]:
+    """ Returns the word count and source stat (see get_source_stat) of the given packed
+        lexicon file. Raises ValueError if the file isn't a packed lexicon for the
+        current WORD_LENGTH. """
+    with open(filepath, 'rb') as file:
+        header = file.read(PACKED_HEADER.size)
+    if len(header) < PACKED_HEADER.size:
+        raise ValueError(f"{filepath} is not a packed lexicon")
+    magic, version, word_length, count, source_mtime, source_size = PACKED_HEADER.unpack(header)
+    if magic != PACKED_MAGIC or version != PACKED_VERSION or word_length != WORD_LENGTH:
+        raise ValueError(f"{filepath} is not a packed lexicon of {WORD_LENGTH} letter words")
+    return count, (source_mtime, source_size)
+
+
+def load_packed_lexicon(filepath: str) -> np.ndarray:
+    """ Returns a read-only (N x WORD_LENGTH) uint8 array of the ASCII letters of each word
+        in the given packed lexicon file. The file is memory-mapped rather than read, so
+        loading is almost instant and processes reading the same file share its pages.
+        Raises ValueError if the file isn't a packed lexicon for the current WORD_LENGTH. """
+    count, _ = read_packed_header(filepath)
+    # A zero length file can't be mapped
+    if count == 0:
+        return np.empty((0, WORD_LENGTH), dtype=np.uint8)
+    return np.memmap(filepath, dtype=np.uint8, mode='r', offset=PACKED_HEADER.size, shape=(count, WORD_LENGTH))
+
+
+def import_packed_lexicon(filepath: str) -> np.ndarray:
+    """ Returns the words of the given text file as a packed array (see load_packed_lexicon).
+        The text file is converted the first time, and the packed file is kept in the
+        cache until the text file changes. The text file isn't read while the packed
+        file is up to date, which is checked with the modification time and size of
+        the text file stored in the header. """
+    key = DataCache.get_name_key([filepath])
+    name = os.path.splitext(os.path.basename(filepath))[0]
+    path = DataCache.get_cache_path(name, key, 'lex')
+    source_stat = get_source_stat(filepath)
+    if os.path.exists(path):
+        try:
+            _, packed_stat = read_packed_header(path)
+            if packed_stat == source_stat:
+                return load_packed_lexicon(path)
+        except (OSError, ValueError):
+            print("Warning: cache file", path, "could not be read, and was ignored.")
+    words = import_lexicon_as_list(filepath)
+    DataCache.write_atomic(path, lambda file: write_packed_lexicon(words, file, source_stat))
+    return load_packed_lexicon(path)
+
+
+def decode_words(packed: np.ndarray) -> list[str]:
+    """ Returns the words of a packed array as a list of strings """
+    letters = packed.tobytes().decode('ascii')
+    return [letters[i:i + WORD_LENGTH] for i in range(0, len(letters), WORD_LENGTH)]
+
+
+
+def decode_codes(codes: np.ndarray) -> list[str]:
+    """ Returns the words of an array of letter indices (see encode_words) as a list of
+        strings """
+    return decode_words(codes + ord('A'))
+
+if __name__ == '__main__':
+    # Convert the data files to packed lexicons ahead of time
+    from constants import LEXICON_FILE, SOLUTIONS_FILE, GUESSES_FILE, ORDERED_SOLUTIONS_FILE
+    for filepath in (LEXICON_FILE, SOLUTIONS_FILE, GUESSES_FILE, ORDERED_SOLUTIONS_FILE):
+        print(filepath, "has", len(import_packed_lexicon(filepath)), "words.")
@@ -0,0 +1,142 @@
+from SearchAgent import SearchAgent
+from FeedbackMatrix import FeedbackMatrix, SOLVED_PATTERN, ratings_to_pattern
+from EntropySearchAgent import EntropySearchAgent, get_best_guess_index
+
+import numpy as np
+
+
+class DecisionTree:
+    """ A precomputed tree of guesses. Each node holds a guess word, and each edge is a
+        feedback pattern leading to the node of the next guess. Node 0 is the root.
+
+        The tree is stored as flat arrays, so it can be written to and read from a
+        single file:
+            node_words    - the guess word of each node
+            edge_offsets  - the edges of node i are edge_offsets[i]:edge_offsets[i+1]
+            edge_patterns - the feedback pattern of each edge
+            edge_children - the node each edge leads to """
+    def __init__(self, node_words: np.ndarray, edge_offsets: np.ndarray, edge_patterns: np.ndarray, edge_children: np.ndarray):
+        self.node_words = node_words
+        self.edge_offsets = edge_offsets
+        self.edge_patterns = edge_patterns
+        self.edge_children = edge_children
+        # Guess word of each node as a string
+        self.words = [word.decode('ascii') for word in node_words]
+        # Children of each node, keyed by feedback pattern
+        self.children = []
+        for node in range(len(self.words)):
+            start, end = edge_offsets[node], edge_offsets[node + 1]
+            self.children.append(dict(zip(edge_patterns[start:end].tolist(), edge_children[start:end].tolist())))
+
+
+    def get_child(self, node: int, pattern: int) -> int:
+        """ Returns the node reached from the given node by the given feedback pattern,
+            or None if no answer gives that feedback """
+        return self.children[node].get(pattern)
+
+
+    def save(self, file):
+        """ Writes the tree to the given .npz file (a path or a file object) """
+        np.savez(file, node_words=self.node_words, edge_offsets=self.edge_offsets,
+                 edge_patterns=self.edge_patterns, edge_children=self.edge_children)
+
+
+    @staticmethod
+    def load(filepath: str) -> 'DecisionTree':
+        """ Reads a tree written by save() """
+        with np.load(filepath) as data:
+            return DecisionTree(data['node_words'], data['edge_offsets'], data['edge_patterns'], data['edge_children'])
+
+
+def build_decision_tree(feedback_matrix: FeedbackMatrix) -> DecisionTree:
+    """ Builds a decision tree which solves every answer in the feedback matrix, choosing
+        the guess at every node the same way as EntropySearchAgent """
+    node_words = []
+    # Edges of each node as (pattern, child) pairs
+    node_edges = []
+    # Nodes to expand, as (node, column indices of the candidate answers)
+    stack = [(0, np.arange(len(feedback_matrix.answer_words)))]
+    node_words.append(None)
+    node_edges.append([])
+
+    while stack:
+        node, candidates = stack.pop()
+        row = get_best_guess_index(feedback_matrix, candidates)
+        node_words[node] = feedback_matrix.guess_words[row]
+        # Split candidates by the feedback they would give
+        patterns = feedback_matrix.patterns[row, candidates]
+        for pattern in np.unique(patterns):
+            # The answer was guessed, so there is no next guess
+            if pattern == SOLVED_PATTERN:
+                continue
+            child = len(node_words)
+            node_words.append(None)
+            node_edges.append([])
+            node_edges[node].append((int(pattern), child))
+            stack.append((child, candidates[patterns == pattern]))
+
+    # Flatten edges into arrays
+    edge_offsets = np.zeros(len(node_words) + 1, dtype=np.int32)
+    edge_offsets[1:] = np.cumsum([len(edges) for edges in node_edges])
+    edge_patterns = np.array([pattern for edges in node_edges for pattern, _ in edges], dtype=np.uint8)
+    edge_children = np.array([child for edges in node_edges for _, child in edges], dtype=np.int32)
+    return DecisionTree(np.array(node_words, dtype='S'), edge_offsets, edge_patterns, edge_children)
+
+
+class DecisionTreeAgent(SearchAgent):
+    """ A DecisionTreeAgent guesses by following a precomputed DecisionTree, so each guess
+        is a single lookup. If the feedback leads off the tree (e.g. the answer isn't in the
+        answer list the tree was built from), the agent falls back to an EntropySearchAgent,
+        if a feedback matrix is given. A new agent should be instantiated for each game.
+        If verbose is False, the agent doesn't print when it leaves the tree. """
+    SHARED_ATTRIBUTES = ('tree', 'vocab', 'feedback_matrix')
+    def __init__(self, decision_tree: DecisionTree, vocab: set=None, feedback_matrix: FeedbackMatrix=None, verbose: bool=True):
+        self.tree = decision_tree
+        # Current node in the tree, or None after leaving the tree
+        self.node = 0
+        # Used to create the fallback agent
+        self.vocab = vocab
+        self.feedback_matrix = feedback_matrix
+        self.fallback_agent = None
+        # Guesses and letter ratings so far, replayed to the fallback agent
+        self.history = []
+        self.verbose = verbose
+
+
+    # --- Define abstract methods
+    # See SearchAgent.py
+    def get_guess(self) -> str:
+        if self.node is not None:
+            return self.tree.words[self.node]
+        if self.fallback_agent is not None:
+            return self.fallback_agent.get_guess()
+        return None
+
+    # See SearchAgent.py
+    def process_feedback(self, guess: str, letter_ratings: list[int]):
+        self.history.append((guess, letter_ratings))
+        if self.node is not None:
+            self.node = self.tree.get_child(self.node, ratings_to_pattern(letter_ratings))
+            if self.node is None:
+                self.start_fallback()
+        elif self.fallback_agent is not None:
+            self.fallback_agent.process_feedback(guess, letter_ratings)
+
+
+    def start_fallback(self):
+        """ Creates the fallback agent and gives it the feedback so far """
+        if self.feedback_matrix is None or self.vocab is None:
+            if self.verbose:
+                print("Feedback is not in the decision tree.")
+            return
+        self.fallback_agent = EntropySearchAgent(self.vocab, self.feedback_matrix)
+        for guess, letter_ratings in self.history:
+            self.fallback_agent.process_feedback(guess, letter_ratings)
+
+
+if __name__ == '__main__':
+    # Build the decision tree ahead of time
+    from DataManager import DataManager
+    data = DataManager()
+    tree = data.get_decision_tree()
+    print("Decision tree has", len(tree.words), "nodes.")
@@ -0,0 +1,108 @@
+from SearchAgent import SearchAgent
+from GuessMemo import GuessMemo
+from FeedbackMatrix import FeedbackMatrix, PATTERN_COUNT, ratings_to_pattern, get_feedback_pattern
+
+import weakref
+import numpy as np
+
+
+# Maximum number of (guess, answer) pairs counted in a single vectorized step
+MAX_CHUNK_PAIRS = 1 << 22
+# Best guess for every answer, cached per feedback matrix since it's the same every game
+_opening_guesses = weakref.WeakKeyDictionary()
+
+
+def get_expected_information(patterns: np.ndarray) -> np.ndarray:
+    """ Takes a (guesses x candidates) array of pattern codes, and returns the expected
+        information (in bits) of each guess, assuming each candidate is equally likely
+        to be the answer """
+    guess_count, candidate_count = patterns.shape
+    information = np.empty(guess_count)
+    chunk_size = max(1, MAX_CHUNK_PAIRS // max(1, candidate_count))
+    for start in range(0, guess_count, chunk_size):
+        chunk = patterns[start:start + chunk_size]
+        rows = len(chunk)
+        # Offset each row's pattern codes so one bincount gives a histogram per row
+        offsets = PATTERN_COUNT * np.arange(rows, dtype=np.intp)[:, None]
+        counts = np.bincount((chunk + offsets).ravel(), minlength=rows * PATTERN_COUNT)
+        counts = counts.reshape(rows, PATTERN_COUNT)
+        # Entropy = log2(n) - sum(c * log2(c)) / n over the pattern counts c
+        weighted = counts * np.log2(np.maximum(counts, 1))
+        information[start:start + chunk_size] = np.log2(candidate_count) - weighted.sum(axis=1) / candidate_count
+    return information
+
+
+def get_best_guess_index(feedback_matrix: FeedbackMatrix, candidates: np.ndarray) -> int:
+    """ Returns the row index of the guess with the highest expected information over
+        the given candidate answer columns. Ties are broken in favor of guesses that
+        could be the answer, then in alphabetical order. """
+    # With one or two candidates, guessing a candidate is as good as any split
+    if len(candidates) <= 2:
+        return feedback_matrix.guess_index[feedback_matrix.answer_words[candidates[0]]]
+    information = get_expected_information(feedback_matrix.patterns[:, candidates])
+    best = np.flatnonzero(information >= information.max() - 1e-9)
+    # Prefer a guess which might be the answer
+    candidate_rows = {feedback_matrix.guess_index[feedback_matrix.answer_words[col]] for col in candidates}
+    for row in best:
+        if row in candidate_rows:
+            return int(row)
+    return int(best[0])
+
+
+class EntropySearchAgent(SearchAgent):
+    """ An EntropySearchAgent guesses the word that gives the most expected information
+        about the answer. It keeps the set of answers consistent with the feedback so far,
+        and for every possible guess counts how the candidates split into feedback patterns
+        using the precomputed feedback matrix. A new agent should be instantiated for
+        each game. If a GuessMemo is given, guesses scored by earlier games with the
+        same feedback are reused. """
+    # Methods timed by a Profiler, and their phase names (see Profiler.py)
+    PROFILED_METHODS = {'get_guess': 'score', 'process_feedback': 'filter'}
+    SHARED_ATTRIBUTES = ('feedback_matrix', 'memo')
+
+    def __init__(self, vocab: set, feedback_matrix: FeedbackMatrix, memo: GuessMemo=None):
+        self.feedback_matrix = feedback_matrix
+        # Optional guesses of earlier games, keyed by feedback history
+        self.memo = memo
+        # Guesses and pattern codes of the feedback so far
+        self.history = []
+        # Column indices of answers which are consistent with all feedback so far
+        self.candidates = np.array(sorted(feedback_matrix.answer_index[word] for word in vocab
+                                          if word in feedback_matrix.answer_index), dtype=np.intp)
+
+
+    # --- Define abstract methods
+    # See SearchAgent.py
+    def get_guess(self) -> str:
+        if len(self.candidates) == 0:
+            return None
+        # The opening guess is the same every game, so it's only calculated once
+        is_opening = len(self.candidates) == len(self.feedback_matrix.answer_words)
+        if is_opening and self.feedback_matrix in _opening_guesses:
+            row = _opening_guesses[self.feedback_matrix]
+        elif self.memo is not None:
+            # Guessing doesn't change the agent, so the feedback is the whole key
+            key = tuple(self.history)
+            row = self.memo.get(key)
+            if row is None:
+                row = get_best_guess_index(self.feedback_matrix, self.candidates)
+                self.memo.put(key, row)
+        else:
+            row = get_best_guess_index(self.feedback_matrix, self.candidates)
+            if is_opening:
+                _opening_guesses[self.feedback_matrix] = row
+        return self.feedback_matrix.guess_words[row]
+
+    # See SearchAgent.py
+    def process_feedback(self, guess: str, letter_ratings: list[int]):
+        """ Removes candidates which would not have given the same letter ratings """
+        pattern = ratings_to_pattern(letter_ratings)
+        self.history.append((guess, pattern))
+        row = self.feedback_matrix.guess_index.get(guess)
+        if row is not None:
+            candidate_patterns = self.feedback_matrix.patterns[row, self.candidates]
+        else:
+            # Guess isn't in the matrix, so calculate feedback directly
+            answer_words = self.feedback_matrix.answer_words
+            candidate_patterns = np.array([get_feedback_pattern(guess, answer_words[col]) for col in self.candidates])
+        self.candidates = self.candidates[candidate_patterns == pattern]
@@ -0,0 +1,167 @@
+from constants import WORD_LENGTH
+from DataProcessing import encode_words
+
+from collections import Counter
+import numpy as np
+
+
+# Number of distinct feedback patterns (each letter is rated 0, 1 or 2)
+PATTERN_COUNT = 3 ** WORD_LENGTH
+# Pattern code of a correct guess ('22222')
+SOLVED_PATTERN = PATTERN_COUNT - 1
+# Number of guess rows scored per vectorized step (bounds temporary memory)
+CHUNK_SIZE = 2048
+
+
+def get_letter_ratings(guess: str, answer: str) -> list[str]:
+    """ Takes a guess and an answer and returns a list of five chars in {0,1,2}, where
+        each char corresponds to a letter in the guess:
+            0 is incorrect,
+            1 is incorrect postion,
+            2 is correct,
+        (For example, guessing the correct answer would return ['2','2','2','2','2']) """
+    # Start with five zeros (all incorrect)
+    letter_ratings = ['0'] * WORD_LENGTH
+    # Keep track of chars in the answer that haven't been guessed
+    remaining_chars = Counter(answer)
+
+    # Check each char in guess for correctness
+    for i, char in enumerate(guess):
+        # If char is correct
+        if char == answer[i]:
+            # Set corresponding rating
+            letter_ratings[i] = '2'
+            # Remove from remaining chars
+            remaining_chars[char] -= 1
+
+    # Check each char in guess for membership in remaining chars
+    for i, char in enumerate(guess):
+        # If char was guessed correctly, skip it
+        if letter_ratings[i] == '2':
+            continue
+        # If char is in the remaining chars, that means it's in the word and hasn't
+        # been correctly guessed, so it's in the incorrect position
+        if remaining_chars[char] > 0:
+            # Set corresponding rating
+            letter_ratings[i] = '1'
+            # Remove from remaining chars
+            remaining_chars[char] -= 1
+
+    # Remaining letter ratings are left as '0'
+    return letter_ratings
+
+
+def ratings_to_pattern(letter_ratings: list[str]) -> int:
+    """ Returns the base-3 pattern code of the given letter ratings. The first letter
+        is the most significant digit, so '22222' is 242 and '00000' is 0. """
+    return int(''.join(letter_ratings), 3)
+
+
+def _make_pattern_table() -> list[tuple]:
+    """ Returns a table where index i holds the letter ratings of pattern code i """
+    table = []
+    for code in range(PATTERN_COUNT):
+        digits = []
+        for _ in range(WORD_LENGTH):
+            digits.append(str(code % 3))
+            code //= 3
+        table.append(tuple(reversed(digits)))
+    return table
+
+# Letter ratings for every pattern code
+PATTERN_RATINGS = _make_pattern_table()
+
+
+def pattern_to_ratings(pattern: int) -> list[str]:
+    """ Returns the letter ratings (e.g. ['2','1','0','0','2']) of the given pattern code """
+    return list(PATTERN_RATINGS[pattern])
+
+
+def get_feedback_pattern(guess: str, answer: str) -> int:
+    """ Returns the pattern code of the feedback for the given guess and answer """
+    return ratings_to_pattern(get_letter_ratings(guess, answer))
+
+
+def compute_patterns(guess_codes: np.ndarray, answer_codes: np.ndarray) -> np.ndarray:
+    """ Returns a (guesses x answers) uint8 array of pattern codes, given the encoded
+        guess words and answer words (see DataProcessing.encode_words) """
+    patterns = np.empty((len(guess_codes), len(answer_codes)), dtype=np.uint8)
+
+    for start in range(0, len(guess_codes), CHUNK_SIZE):
+        guesses = guess_codes[start:start + CHUNK_SIZE]
+        # Letters in the correct position, green[i] is a (guesses x answers) array
+        green = [guesses[:, i, None] == answer_codes[None, :, i] for i in range(WORD_LENGTH)]
+        chunk = np.zeros(green[0].shape, dtype=np.uint8)
+        for i in range(WORD_LENGTH):
+            letter = guesses[:, i, None]
+            # Count of this letter in the answer, excluding green positions
+            available = np.zeros(chunk.shape, dtype=np.uint8)
+            for j in range(WORD_LENGTH):
+                available += (letter == answer_codes[None, :, j]) & ~green[j]
+            # Count of this letter earlier in the guess, excluding green positions
+            # (these claim the available letters first)
+            claimed = np.zeros(chunk.shape, dtype=np.uint8)
+            for k in range(i):
+                claimed += (letter == guesses[:, k, None]) & ~green[k]
+            # Letter is in the answer, but in the wrong position
+            yellow = ~green[i] & (available > claimed)
+            # Shift previous digits and add this letter's rating as the next base-3 digit
+            # (green is added twice for a rating of 2)
+            chunk *= 3
+            chunk += green[i]
+            chunk += green[i]
+            chunk += yellow
+        patterns[start:start + CHUNK_SIZE] = chunk
+
+    return patterns
+
+
+class FeedbackMatrix:
+    """ Precomputed feedback patterns for every guess word against every answer word.
+        Patterns are stored as base-3 codes (see ratings_to_pattern) in a uint8 array,
+        so looking up the feedback of a guess is O(1). Pairs outside the matrix fall
+        back to computing the feedback directly. """
+    def __init__(self, guess_words: list[str], answer_words: list[str], patterns: np.ndarray=None):
+        # Row and column words
+        self.guess_words = list(guess_words)
+        self.answer_words = list(answer_words)
+        # Map each word to its row/column index
+        self.guess_index = {word: i for i, word in enumerate(self.guess_words)}
+        self.answer_index = {word: i for i, word in enumerate(self.answer_words)}
+        # Pattern codes, patterns[guess index, answer index]
+        if patterns is None:
+            patterns = compute_patterns(encode_words(self.guess_words), encode_words(self.answer_words))
+        self.patterns = patterns
+
+
+    def get_pattern(self, guess: str, answer: str) -> int:
+        """ Returns the pattern code of the feedback for the given guess and answer """
+        row = self.guess_index.get(guess)
+        col = self.answer_index.get(answer)
+        if row is None or col is None:
+            return get_feedback_pattern(guess, answer)
+        return int(self.patterns[row, col])
+
+
+    def get_letter_ratings(self, guess: str, answer: str) -> list[str]:
+        """ Returns the letter ratings (e.g. ['2','1','0','0','2']) for the given guess
+            and answer. See get_letter_ratings() """
+        return pattern_to_ratings(self.get_pattern(guess, answer))
+
+
+    def get_patterns(self, guess: str, answers) -> list[int]:
+        """ Returns the pattern codes of the feedback for the given guess against each
+            of the given answers """
+        row = self.guess_index.get(guess)
+        if row is None:
+            return [get_feedback_pattern(guess, answer) for answer in answers]
+        # Read the row once as a list, which is faster to index than the array
+        row_patterns = self.patterns[row].tolist()
+        patterns = []
+        for answer in answers:
+            col = self.answer_index.get(answer)
+            if col is None:
+                patterns.append(get_feedback_pattern(guess, answer))
+            else:
+                patterns.append(row_patterns[col])
+        return patterns
@@ -0,0 +1,109 @@
+from abc import ABC, abstractmethod
+from collections import deque
+import heapq
+
+
+class Fringe(ABC):
+    """ A collection of search nodes waiting to be expanded. Searches run on a single
+        thread, so fringes don't use locks (unlike the classes in the queue module). """
+    # Methods timed by a Profiler, and their phase names (see Profiler.py)
+    PROFILED_METHODS = {'put': 'fringe put', 'get': 'fringe get'}
+
+    @abstractmethod
+    def put(self, item, priority: float=0):
+        """ Adds an item to the fringe. Priority is ignored by unordered fringes. """
+        pass
+
+    @abstractmethod
+    def get(self):
+        """ Removes and returns the next item """
+        pass
+
+    @abstractmethod
+    def clear(self):
+        """ Removes every item """
+        pass
+
+    @abstractmethod
+    def __len__(self) -> int:
+        pass
+
+    def empty(self) -> bool:
+        """ Returns true if the fringe has no items """
+        return len(self) == 0
+
+
+class FIFOFringe(Fringe):
+    """ First in, first out (breadth-first search) """
+    def __init__(self):
+        self.items = deque()
+
+    def put(self, item, priority: float=0):
+        self.items.append(item)
+
+    def get(self):
+        return self.items.popleft()
+
+    def clear(self):
+        self.items.clear()
+
+    def __len__(self) -> int:
+        return len(self.items)
+
+
+class LIFOFringe(Fringe):
+    """ Last in, first out (depth-first search) """
+    def __init__(self):
+        self.items = []
+
+    def put(self, item, priority: float=0):
+        self.items.append(item)
+
+    def get(self):
+        return self.items.pop()
+
+    def clear(self):
+        self.items.clear()
+
+    def __len__(self) -> int:
+        return len(self.items)
+
+
+class PriorityFringe(Fringe):
+    """ Lowest priority first. Items with equal priority are returned in the order they
+        were added, using a counter so the items themselves are never compared. """
+    def __init__(self):
+        # Heap of (priority, count, item)
+        self.heap = []
+        # Number of items added, an int rather than an iterator so fringes can be
+        # copied (see SearchAgent.fork)
+        self.count = 0
+
+    def put(self, item, priority: float=0):
+        heapq.heappush(self.heap, (priority, self.count, item))
+        self.count += 1
+
+    def get(self):
+        return heapq.heappop(self.heap)[2]
+
+    def clear(self):
+        self.heap.clear()
+        self.count = 0
+
+    def __len__(self) -> int:
+        return len(self.heap)
+
+
+class BeamFringe(PriorityFringe):
+    """ A priority fringe which only keeps the best (lowest priority) items. Once the
+        fringe holds twice its width, it is cut down to the best width items, so pruning
+        costs O(log n) per item on average. """
+    def __init__(self, width: int):
+        super().__init__()
+        self.width = width
+
+    def put(self, item, priority: float=0):
+        super().put(item, priority)
+        if len(self.heap) >= 2 * self.width:
+            # A sorted list is a valid heap
+            self.heap = heapq.nsmallest(self.width, self.heap)
@@ -1,23 +1,36 @@
 import DataProcessing
+import FeedbackMatrix
+from Profiler import Profiler
 from constants import MAX_GUESS_LIMIT, MAX_GUESS_COUNT, WORD_LENGTH
 
-from collections import Counter
 #import resource
 import time
 import os
 
-from ReportDataCollector import ReportDataCollector
 
 
 class GameManager:
-    """ Runs the Wordle game loop """
+    """ Runs the Wordle game loop. If verbose is False, the game doesn't print each
+        guess and rating, so printing doesn't add to the recorded times. Failures
+        are still printed. """
+    # Methods timed by a Profiler, and their phase names (see Profiler.py)
+    PROFILED_METHODS = {'get_letter_ratings': 'feedback'}
 
-    def __init__(self, lexicon: set, agent=None):
+    def __init__(self, lexicon: set, agent=None, feedback_matrix: FeedbackMatrix.FeedbackMatrix=None, profiler: Profiler=None, verbose: bool=True):
         """ The start() function sets the answer, and resets the guess_count to 0 """
         self.answer = None
         self.guess_count = 0
         self.legal_words = lexicon
         self.agent = agent
+        self.verbose = verbose
+        # Optional precomputed feedback patterns used to rate guesses
+        self.feedback_matrix = feedback_matrix
+        # Optional instrumentation of the game and agent (see Profiler.py)
+        self.profiler = profiler
+        if profiler is not None:
+            profiler.instrument(self)
+            if agent is not None:
+                profiler.instrument(agent)
 
         # Stats
         self.guess_durations = []
@@ -39,7 +52,8 @@ class GameManager:
         guess_duration = time.process_time() - start_time
         self.guess_durations.append(guess_duration)
         # Print and return
-        print('Agent guess:     ', guess)    
+        if self.verbose:
+            print('Agent guess:     ', guess)    
         return guess
 
 
@@ -63,10 +77,12 @@ class GameManager:
     def validate(self, guess: str) -> bool:
         """ Returns true if the guess is a valid word in the dictionary """  
         if len(guess) != WORD_LENGTH:
-            print("The length of the guess must be five letters.")
+            if self.verbose:
+                print("The length of the guess must be five letters.")
             return False
         if guess not in self.legal_words:
-            print(guess, "is not in the game dictionary.")
+            if self.verbose:
+                print(guess, "is not in the game dictionary.")
             return False
         # Else word is valid
         return True
@@ -79,42 +95,18 @@ class GameManager:
                 1 is incorrect postion,
                 2 is correct,
             (For example, guessing the correct answer would return ['2','2','2','2','2']) """
-        # Start with five zeros (all incorrect)
-        letter_ratings = ['0'] * WORD_LENGTH
-        # Keep track of chars in the answer that haven't been guessed 
-        remaining_chars = Counter(self.answer) 
-
-        # Check each char in guess for correctness
-        for i, char in enumerate(guess):
-            # If char is correct
-            if char == self.answer[i]:
-                # Set corresponding rating
-                letter_ratings[i] = '2'
-                # Remove from remaining chars
-                remaining_chars.subtract(char)
-        
-        # Check each char in guess for membership in remaining chars
-        for i, char in enumerate(guess):
-            # If char was guessed correctly, skip it
-            if letter_ratings[i] == '2':
-                continue
-            # If char is in the remaining chars, that means it's in the word and hasn't
-            # been correctly guessed, so it's in the incorrect position
-            if remaining_chars[char] > 0:
-                # Set corresponding rating
-                letter_ratings[i] = '1'
-                # Remove from remaining chars
-                remaining_chars.subtract(char)
-        
-        # Remaining letter ratings are left as '0'
-        return letter_ratings
+        # Look up ratings in the precomputed feedback matrix if one is attached
+        if self.feedback_matrix is not None:
+            return self.feedback_matrix.get_letter_ratings(guess, self.answer)
+        return FeedbackMatrix.get_letter_ratings(guess, self.answer)
 
 
     def start(self, answer: str, use_AI: bool=True, guess_limit: int=MAX_GUESS_LIMIT) -> bool:
         """ Run a game of Wordle using the given answer. Returns true if game is won.
             If use_AI is False, then the user will be prompted for guesses """
 
-        print("Running Wordle:")
+        if self.verbose:
+            print("Running Wordle:")
 
         # Set up game
         self.guess_count = 0
@@ -140,15 +132,17 @@ class GameManager:
             rating_str = ''.join(letter_ratings)
 
             # Print letter ratings aligned with guess
-            print('Ratings:         ', rating_str)
+            if self.verbose:
+                print('Ratings:         ', rating_str)
 
             # Inform AI of letter ratings
             if use_AI:
-                self.agent.adjust_letter_probs(guess, letter_ratings)
+                self.agent.process_feedback(guess, letter_ratings)
 
             # If correct, inform user and return true
             if rating_str == '22222':
-                print("Success!", guess, "is correct!")
+                if self.verbose:
+                    print("Success!", guess, "is correct!")
                 return True
 
         # Reached maximum number of guesses
@@ -182,7 +176,8 @@ class GameManager:
         successful = is_solved and self.guess_count <= MAX_GUESS_COUNT
 
         # Create row for DataFrame
-        self.dataCollector.recordData([ answer, self.guess_count, successful, avg_guess_time, game_duration ])
+        profile = self.profiler.get_row() if self.profiler is not None else None
+        self.dataCollector.recordData([ answer, self.guess_count, successful, avg_guess_time, game_duration ], profile)
 
         return []
 
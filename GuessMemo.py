@@ -0,0 +1,43 @@
+from constants import GUESS_MEMO_SIZE
+
+from collections import OrderedDict
+
+
+class GuessMemo:
+    """ A cache of the guesses agents made after each feedback history, shared by the
+        games of a run so a search is only done once for each distinct history. Keys
+        are the sequence of (guess, pattern code) pairs an agent has been given, with
+        anything else the agent needs to tell states apart (e.g. the number of guesses
+        asked for, which grows when a guess is rejected). Values are the guess and
+        whatever state the search changed, so a later game can continue from it.
+
+        Agents are deterministic, so a memo gives the same guesses as searching, but it
+        must only be shared by agents of the same type created with the same data. The
+        least recently used entries are dropped once the memo holds max_size entries. """
+    def __init__(self, max_size: int=GUESS_MEMO_SIZE):
+        # Entries from least to most recently used
+        self.entries = OrderedDict()
+        self.max_size = max_size
+        # Number of lookups that found or didn't find an entry
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: tuple):
+        """ Returns the entry with the given key, or None if there isn't one """
+        entry = self.entries.get(key)
+        if entry is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        self.entries.move_to_end(key)
+        return entry
+
+    def put(self, key: tuple, entry):
+        """ Adds an entry, dropping the least recently used entry if the memo is full """
+        self.entries[key] = entry
+        self.entries.move_to_end(key)
+        if len(self.entries) > self.max_size:
+            self.entries.popitem(last=False)
+
+    def __len__(self) -> int:
+        return len(self.entries)
@@ -0,0 +1,68 @@
+from collections import Counter
+import time
+
+
+class Profiler:
+    """ Opt-in instrumentation of a single game. The profiler replaces methods of the
+        game and its agent with wrappers that time each call with perf_counter_ns and
+        count it under a phase name, so nothing is added to the methods themselves and
+        games that aren't profiled run exactly as before.
+
+        Each class lists the methods to time in PROFILED_METHODS (method name -> phase
+        name), integer attributes to report in PROFILED_COUNTERS, and attributes holding
+        other objects to instrument in PROFILED_PARTS. Phase times are inclusive, e.g.
+        the 'search' phase of a TreeSearchAgent includes its 'score' and 'expand'
+        phases. """
+    def __init__(self):
+        # Total nanoseconds and number of calls of each phase
+        self.phase_ns = Counter()
+        self.phase_calls = Counter()
+        # Objects whose PROFILED_COUNTERS are reported
+        self.counted_objects = []
+
+    def instrument(self, obj, methods: dict=None):
+        """ Wraps the methods of the given object that are listed in the given dict
+            (default obj.PROFILED_METHODS), and reports its PROFILED_COUNTERS """
+        if methods is None:
+            methods = getattr(obj, 'PROFILED_METHODS', {})
+        for method_name, phase in methods.items():
+            if hasattr(obj, method_name):
+                self.wrap(obj, method_name, phase)
+        if getattr(obj, 'PROFILED_COUNTERS', ()):
+            self.counted_objects.append(obj)
+        for part in getattr(obj, 'PROFILED_PARTS', ()):
+            self.instrument(getattr(obj, part))
+
+    def wrap(self, obj, method_name: str, phase: str):
+        """ Replaces the method of the given object with one that is timed as phase """
+        method = getattr(obj, method_name)
+        phase_ns = self.phase_ns
+        phase_calls = self.phase_calls
+        get_time = time.perf_counter_ns
+        # Report every wrapped phase, even if it's never called, so every game of an
+        # agent has the same columns
+        phase_ns[phase] += 0
+        phase_calls[phase] += 0
+
+        def timed_method(*args, **kwargs):
+            start = get_time()
+            try:
+                return method(*args, **kwargs)
+            finally:
+                phase_ns[phase] += get_time() - start
+                phase_calls[phase] += 1
+
+        # Set on the instance, so other instances of the class are unaffected
+        setattr(obj, method_name, timed_method)
+
+    def get_row(self) -> dict:
+        """ Returns the time (in ms) and number of calls of each phase, and the
+            counters, as columns to add to the game's report row """
+        row = dict()
+        for phase in sorted(self.phase_ns):
+            row[f'{phase} (ms)'] = self.phase_ns[phase] / 1e6
+            row[f'{phase} calls'] = self.phase_calls[phase]
+        for obj in self.counted_objects:
+            for counter in obj.PROFILED_COUNTERS:
+                row[counter.replace('_', ' ')] = getattr(obj, counter)
+        return row
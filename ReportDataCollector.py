@@ -1,26 +1,253 @@
 from typing import List
-import pandas as pd
 from datetime import datetime
-import matplotlib.pyplot as plt
+from collections import Counter
+import csv
+import heapq
+import json
+import math
+import os
+
+
+# Columns of a game row, and their types
+REPORT_FIELDS = ['Answer', 'Guess Count', 'Success', 'Avg Guess Time (ms)', 'Game Duration (ms)']
+REPORT_FIELD_TYPES = {'Answer': str, 'Guess Count': int, 'Success': bool, 'Avg Guess Time (ms)': float, 'Game Duration (ms)': float}
+# Number of easiest and hardest games in the summary
+TOP_GAME_COUNT = 10
+
+
+class RunningStats:
+    """ Summary statistics of game rows, updated one row at a time. Memory doesn't grow
+        with the number of games: game durations are counted in logarithmic buckets (so
+        quantiles are within about 2% of the exact value), and only the easiest and
+        hardest games are kept. """
+    # Ratio between the bounds of consecutive duration buckets
+    BUCKET_RATIO = 1.02
 
-class ReportDataCollector:
     def __init__(self):
+        self.game_count = 0
+        self.success_count = 0
+        self.guess_count_total = 0
+        self.guess_time_total = 0.0
+        self.duration_total = 0.0
+        # Number of games with each guess count
+        self.guess_histogram = Counter()
+        # Totals of any other numeric columns (e.g. profiled phases, see Profiler.py)
+        self.extra_totals = Counter()
+        # Number of games in each game duration bucket
+        self.duration_histogram = Counter()
+        # Heaps of (key, row) with the easiest and hardest games, where key breaks ties
+        # in favor of games played first
+        self.easiest = []
+        self.hardest = []
+
+    def add(self, row: dict):
+        """ Updates the statistics with the given game row """
+        index = self.game_count
+        self.game_count += 1
+        self.success_count += bool(row['Success'])
+        self.guess_count_total += row['Guess Count']
+        self.guess_time_total += row['Avg Guess Time (ms)']
+        self.duration_total += row['Game Duration (ms)']
+        self.guess_histogram[row['Guess Count']] += 1
+        self.duration_histogram[self.get_bucket(row['Game Duration (ms)'])] += 1
+        for key, value in row.items():
+            if key not in REPORT_FIELDS and isinstance(value, (int, float)):
+                self.extra_totals[key] += value
+        # The root of each heap is the game that is dropped first
+        self.push_top_game(self.easiest, (-row['Guess Count'], -index), row)
+        self.push_top_game(self.hardest, (row['Guess Count'], -index), row)
+
+    @staticmethod
+    def push_top_game(heap: list, key: tuple, row: dict):
+        """ Adds the game to the heap, dropping the game with the lowest key if the heap
+            is full """
+        if len(heap) < TOP_GAME_COUNT:
+            heapq.heappush(heap, (key, row))
+        elif key > heap[0][0]:
+            heapq.heapreplace(heap, (key, row))
+
+    def get_easiest_games(self) -> list[dict]:
+        """ Returns the rows of the games with the fewest guesses, easiest first """
+        return [row for key, row in sorted(self.easiest, reverse=True)]
+
+    def get_hardest_games(self) -> list[dict]:
+        """ Returns the rows of the games with the most guesses, hardest first """
+        return [row for key, row in sorted(self.hardest, reverse=True)]
+
+    @classmethod
+    def get_bucket(cls, duration: float) -> int:
+        """ Returns the bucket of the given duration. Durations of 1 microsecond or less
+            share the lowest bucket. """
+        return max(0, math.ceil(math.log(max(duration, 0.001) / 0.001, cls.BUCKET_RATIO)))
+
+    def get_duration_quantile(self, q: float) -> float:
+        """ Returns an estimate of the q-th quantile (0 to 1) of the game durations """
+        rank = q * (self.game_count - 1)
+        seen = 0
+        for bucket in sorted(self.duration_histogram):
+            seen += self.duration_histogram[bucket]
+            if seen > rank:
+                # Upper bound of the bucket
+                return 0.001 * self.BUCKET_RATIO ** bucket
+        return 0.0
+
+
+class ReportDataCollector:
+    """ Records a row for each game and writes the reports. By default rows are kept in
+        memory until generateReport. If a stream file (.csv or .jsonl) is given, each
+        row is instead appended to the file as soon as it is recorded, and the reports
+        are written from running statistics, so memory doesn't grow with the number of
+        games. Rows already in the stream file are included, so an interrupted run can
+        be continued with the same file (see recorded_answers). """
+    def __init__(self, stream_file: str=None):
         self.RunTimeData = []
+        self.stream_file = stream_file
+        self.stream = None
+        self.stats = None
+        # Number of times each answer was already recorded in the stream file
+        self.recorded_answers = Counter()
+        if stream_file is not None:
+            self.openStream()
+
+    def openStream(self):
+        """ Reads the rows already in the stream file, and opens it for appending """
+        self.stats = RunningStats()
+        self.is_jsonl = self.stream_file.endswith('.jsonl')
+        directory = os.path.dirname(self.stream_file)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        if os.path.exists(self.stream_file):
+            self.truncatePartialRow()
+        is_new = not os.path.exists(self.stream_file) or os.path.getsize(self.stream_file) == 0
+        # Whether the rows have profile columns, taken from the first row (see recordRow)
+        self.is_profiled = None
+        if not is_new:
+            for row in self.readStream():
+                if self.is_profiled is None:
+                    self.is_profiled = self.hasProfile(row)
+                self.stats.add(row)
+                self.recorded_answers[row['Answer']] += 1
+        self.stream = open(self.stream_file, 'a', newline='')
+        # The CSV columns are taken from the file's header, or from the first row
+        # recorded in a new file (see recordRow)
+        self.csv_writer = None
+        if not self.is_jsonl and not is_new:
+            with open(self.stream_file, 'r', newline='') as file:
+                fieldnames = next(csv.reader(file))
+            self.csv_writer = csv.DictWriter(self.stream, fieldnames=fieldnames)
+
+    def truncatePartialRow(self):
+        """ Removes a row that was only partly written (e.g. when a run was killed) from
+            the end of the stream file """
+        with open(self.stream_file, 'rb+') as file:
+            data = file.read()
+            if not data.endswith(b'\n'):
+                file.truncate(data.rfind(b'\n') + 1)
+
+    def readStream(self):
+        """ Yields the rows in the stream file """
+        with open(self.stream_file, 'r', newline='') as file:
+            if self.is_jsonl:
+                for line in file:
+                    if line.strip():
+                        yield json.loads(line)
+            else:
+                for row in csv.DictReader(file):
+                    yield self.parseRow(row)
 
-    def recordData(self, record):
+    @staticmethod
+    def getColumnType(column: str) -> type:
+        """ Returns the type of the values in a column. Besides the standard columns,
+            rows only have profile columns (see Profiler.get_row), whose times end in
+            ' (ms)' and whose call counts and counters are integers. """
+        if column in REPORT_FIELD_TYPES:
+            return REPORT_FIELD_TYPES[column]
+        return float if column.endswith(' (ms)') else int
+
+    @classmethod
+    def parseRow(cls, row: dict) -> dict:
+        """ Converts the values of a row read from a CSV file from strings """
+        parsed = dict()
+        for key, value in row.items():
+            if value == '':
+                continue
+            column_type = cls.getColumnType(key)
+            if column_type is bool:
+                parsed[key] = value == 'True'
+            else:
+                parsed[key] = column_type(value)
+        return parsed
+
+    @staticmethod
+    def hasProfile(row: dict) -> bool:
+        """ Returns whether the row has columns besides the standard columns """
+        return any(key not in REPORT_FIELD_TYPES for key in row)
+
+    def recordData(self, record, extra: dict=None):
+        """ Records a game. Columns in extra (e.g. the game's profile, see Profiler.py)
+            are added after the standard columns. """
         [ answer, guess_count, successful, avg_guess_time, game_duration ] = record
 
-        self.RunTimeData.append(
-            {
+        row = {
                 'Answer': answer,
                 'Guess Count': guess_count,
                 'Success' :  successful,
                 'Avg Guess Time (ms)': 1000 * avg_guess_time,
                 'Game Duration (ms)' : 1000 * game_duration
             }
-        )
+        if extra:
+            row.update(extra)
+        self.recordRow(row)
+
+    def recordRow(self, row: dict):
+        """ Records a game row, appending it to the stream file when streaming """
+        if self.stream is None:
+            self.RunTimeData.append(row)
+            return
+        if self.is_jsonl:
+            if self.is_profiled is None:
+                self.is_profiled = self.hasProfile(row)
+            elif self.hasProfile(row) != self.is_profiled:
+                # The profile columns of each game can differ, but a resumed run must
+                # profile every game or none, so the averages of the columns are right
+                profiled = 'profiled' if self.is_profiled else 'unprofiled'
+                raise ValueError(f"{self.stream_file} has {profiled} games, so every game added to it "
+                                 f"must be {profiled} too. Resume it with the same options, or use a new file")
+            self.stream.write(json.dumps(row) + '\n')
+        else:
+            if self.csv_writer is None:
+                self.csv_writer = csv.DictWriter(self.stream, fieldnames=list(row))
+                self.csv_writer.writeheader()
+            elif set(row) != set(self.csv_writer.fieldnames):
+                # A resumed run must record the same columns (e.g. both with or both
+                # without --profile), so no column is dropped or left empty
+                raise ValueError(f"The columns of {self.stream_file} don't match the game's columns "
+                                 f"{list(row)}. Resume it with the same options, or use a new file")
+            self.csv_writer.writerow(row)
+        # Write the row now, so it isn't lost if the run is interrupted
+        self.stream.flush()
+        self.stats.add(row)
+
+    def recordRows(self, rows: list[dict]):
+        """ Records rows that were recorded by another collector (e.g. in a worker process) """
+        for row in rows:
+            self.recordRow(row)
 
-    def generateReport(self, agent_type: str, duration: float, test_mode:str):
+    def close(self):
+        """ Closes the stream file """
+        if self.stream is not None:
+            self.stream.close()
+            self.stream = None
+
+    def generateReport(self, agent_type: str, duration: float, test_mode:str, plot: bool=True):
+        """ Writes the summary and full reports, and plots the guess counts if plot is
+            true. pandas and matplotlib are only imported when a plot is made, otherwise
+            the reports are written from running statistics (see generateStatsReport). """
+        if self.stats is not None or not plot:
+            self.generateStatsReport(agent_type, duration, test_mode, plot)
+            return
+        # Imported here since importing pandas is slow
+        import pandas as pd
         self.report_df = pd.DataFrame.from_records(self.RunTimeData)
         self.agent_type = agent_type
         self.duration = duration
@@ -51,6 +278,8 @@ class ReportDataCollector:
         avg_guess_count = round(self.report_df['Guess Count'].mean(), p)
         total_avg_guess_time = round(self.report_df['Avg Guess Time (ms)'].mean(), p)
         avg_game_duration = round(self.report_df['Game Duration (ms)'].mean(), p)
+        # Average of any other columns (e.g. profiled phases)
+        extra_averages = self.report_df.drop(columns=REPORT_FIELDS).mean(numeric_only=True).round(p)
     
         # Round stats
         self.report_df = self.report_df.round(p)
@@ -71,6 +300,8 @@ class ReportDataCollector:
             f.write("Avg Guess Count: {}\n".format(avg_guess_count))
             f.write("Total Avg Guess Time (ms): {}\n".format(total_avg_guess_time))
             f.write("Avg Game Duration (ms): {}\n".format(avg_game_duration))
+            for column, average in extra_averages.items():
+                f.write("Avg {}: {}\n".format(column, average))
 
         # Sort by easiest games (fewest guesses)
         self.report_df.sort_values(by='Guess Count', ascending=True, inplace=True)
@@ -130,6 +361,82 @@ class ReportDataCollector:
             f.write("Top 10 Easiest Games (fewest guesses):\n")
         self.report_df.to_csv(filename, mode='a', index=False)
 
+    def generateStatsReport(self, agent_type: str, duration: float, test_mode: str, plot: bool=True):
+        """ Writes the same reports as generateReport in pure Python, from running
+            statistics. When streaming, the full report is copied from the stream file,
+            without loading every row into memory. """
+        self.close()
+        if self.stats is None:
+            self.stats = RunningStats()
+            for row in self.RunTimeData:
+                self.stats.add(row)
+            all_games_title = "All Games (fewest guesses first):\n"
+            all_games = sorted(self.RunTimeData, key=lambda row: row['Guess Count'])
+        else:
+            all_games_title = "All Games (in the order played):\n"
+            all_games = self.readStream()
+        self.agent_type = agent_type
+        self.duration = duration
+        self.test_mode = test_mode
+        self.current_datetime = datetime.now().strftime("%Y-%m-%d_%H-%M-%S")
+
+        # Write summary, with the easiest and hardest games
+        filename = f"test_results/wordle_test_{self.current_datetime}.txt"
+        with open(filename, 'w', newline='') as f:
+            self.writeStats(f)
+            f.write("\n")
+            f.write("Top 10 Easiest Games (fewest guesses):\n")
+            self.writeRows(f, self.stats.get_easiest_games())
+            f.write("\n")
+            f.write("Top 10 Hardest Games (most guesses):\n")
+            self.writeRows(f, self.stats.get_hardest_games())
+
+        # Write every game
+        filename = f"test_results/wordle_test_full_{self.current_datetime}.txt"
+        with open(filename, 'w', newline='') as f:
+            self.writeStats(f)
+            f.write("\n")
+            f.write(all_games_title)
+            self.writeRows(f, all_games)
+
+        # Generate plot
+        if plot:
+            self.plotGuessCounts(dict(self.stats.guess_histogram), self.stats.game_count)
+
+    def writeStats(self, f):
+        """ Writes the overall statistics of the running statistics to the given file """
+        stats = self.stats
+        # Precision
+        p = 2 # num of digits after decimal
+        count = max(1, stats.game_count)
+        f.write("Date: {}\n".format(datetime.now().strftime("%Y-%m-%d")))
+        f.write("Search Mode: {}\n".format(self.agent_type))
+        f.write("Dataset mode: {}\n".format(self.test_mode))
+        f.write("Test Size: {}\n".format(stats.game_count))
+        f.write("Test Duration (min): {}\n".format(self.duration))
+        f.write("Win Percentage (%): {}\n".format(round(100 * stats.success_count / count, p)))
+        f.write("Avg Guess Count: {}\n".format(round(stats.guess_count_total / count, p)))
+        f.write("Total Avg Guess Time (ms): {}\n".format(round(stats.guess_time_total / count, p)))
+        f.write("Avg Game Duration (ms): {}\n".format(round(stats.duration_total / count, p)))
+        for q in (0.5, 0.9, 0.99):
+            f.write("Game Duration p{} (ms): {}\n".format(round(100 * q), round(stats.get_duration_quantile(q), p)))
+        f.write("Guess Count Histogram: {}\n".format(dict(sorted(stats.guess_histogram.items()))))
+        # Write the average of any other columns (e.g. profiled phases)
+        for key, total in stats.extra_totals.items():
+            f.write("Avg {}: {}\n".format(key, round(total / count, p)))
+
+    @staticmethod
+    def writeRows(f, rows):
+        """ Writes the given game rows to the given file as CSV, rounding values. The
+            columns are those of the first row. """
+        writer = None
+        for row in rows:
+            if writer is None:
+                writer = csv.DictWriter(f, fieldnames=list(row), lineterminator='\n', extrasaction='ignore')
+                writer.writeheader()
+            writer.writerow({key: round(value, 2) if isinstance(value, float) else value
+                             for key, value in row.items()})
+
     def sortWordsByDifficulty(self):
         filename = f"Data/valid_solutions_ordered.csv"
     
@@ -146,7 +453,12 @@ class ReportDataCollector:
         """ generate plot with guess count. """
         # Convert data to DataFrame
         counts = self.report_df['Guess Count'].value_counts().to_dict()
+        self.plotGuessCounts(counts, len(self.report_df))
 
+    def plotGuessCounts(self, counts: dict, game_count: int):
+        """ Plots the number of games with each guess count """
+        # Imported here since importing matplotlib is slow
+        import matplotlib.pyplot as plt
         filename = f"test_results/wordle_test_plot_{self.current_datetime}.png"
         
         x_axis = list(counts.keys())
@@ -155,7 +467,7 @@ class ReportDataCollector:
         # configuration for the bar plot 
         plt.bar(x_axis, y_axis, edgecolor='black')
         plt.xticks(x_axis)
-        plt.title('Distribution of Game Results [' + self.agent_type + '/' + self.test_mode + '/' + str(len(self.report_df)) + ']')
+        plt.title('Distribution of Game Results [' + self.agent_type + '/' + self.test_mode + '/' + str(game_count) + ']')
         plt.xlabel('Number of Guesses')
         plt.ylabel('Number of Games')
 
@@ -1,9 +1,14 @@
 
 from collections import Counter
 from abc import ABC, abstractmethod
+import copy
 
 
 class SearchAgent(ABC):
+    # Methods timed by a Profiler, and their phase names (see Profiler.py)
+    PROFILED_METHODS = {'get_guess': 'guess', 'process_feedback': 'update'}
+    # Attributes holding data that forks share instead of copying (see fork)
+    SHARED_ATTRIBUTES = ()
     
     @abstractmethod
     def get_guess(self) -> str:
@@ -11,7 +16,7 @@ class SearchAgent(ABC):
         pass
     
     @abstractmethod
-    def process_feedback(guess: str, letter_ratings: list[int]):
+    def process_feedback(self, guess: str, letter_ratings: list[int]):
         """ Adjusts agent's internal information based on the given letter ratings for
             the given guess. Each index in the letter_ratings corresponds to a character
             in the guess.
@@ -21,6 +26,20 @@ class SearchAgent(ABC):
             (For example, the correct guess would have letter_ratings = ['2','2','2','2','2']) """
         pass
 
+    def fork(self) -> 'SearchAgent':
+        """ Returns a copy of the agent in its current state, which can be given different
+            feedback from now on without affecting this agent. The attributes listed in
+            SHARED_ATTRIBUTES are shared with the copy, as are frozensets (which can't
+            change), and everything else is copied. """
+        memo = dict()
+        for name in self.SHARED_ATTRIBUTES:
+            value = getattr(self, name, None)
+            memo[id(value)] = value
+        for value in vars(self).values():
+            if isinstance(value, frozenset):
+                memo[id(value)] = value
+        return copy.deepcopy(self, memo)
+
 
 
     
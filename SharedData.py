@@ -0,0 +1,155 @@
+from collections import Counter
+from multiprocessing import shared_memory
+import numpy as np
+
+import DataProcessing
+from constants import WORD_LENGTH
+
+
+class SharedVocab:
+    """ An immutable vocabulary shared by every game, so agents don't have to copy it.
+        Holds the words in alphabetical order, a frozenset for membership checks, and
+        the encoded letter array (see DataProcessing.encode_words). Agents track the
+        words they've eliminated separately. """
+    def __init__(self, words, codes: np.ndarray=None):
+        """ Creates a vocab of the given words. If codes is given, its rows are the
+            encoded words in the order of words, and they're reordered with them. """
+        words = list(words)
+        order = sorted(range(len(words)), key=words.__getitem__)
+        self.words = tuple(words[i] for i in order)
+        self.word_set = frozenset(self.words)
+        # Map each word to its index in words
+        self.index = {word: i for i, word in enumerate(self.words)}
+        if codes is None:
+            codes = DataProcessing.encode_words(self.words)
+        elif len(codes) != len(words):
+            raise ValueError(f"Got {len(codes)} encoded words for {len(words)} words")
+        elif order != list(range(len(words))):
+            # Indexing copies the array
+            codes = codes[order]
+        elif codes.flags.writeable:
+            # Don't freeze the caller's array. Read-only arrays (e.g. in shared memory)
+            # are shared as they are
+            codes = codes.copy()
+        # Prevent agents from changing the shared array
+        codes.flags.writeable = False
+        self.codes = codes
+        # Words grouped by their letters outside each position, built on first use
+        # (see get_neighbors)
+        self.neighbor_index = None
+
+    def __contains__(self, word) -> bool:
+        return word in self.word_set
+
+    def __iter__(self):
+        return iter(self.words)
+
+    def __len__(self) -> int:
+        return len(self.words)
+
+    def __deepcopy__(self, memo) -> 'SharedVocab':
+        # Immutable, so copies of agents share it
+        return self
+
+    def get_neighbors(self, word: str, position: int) -> tuple:
+        """ Returns the vocab words (in alphabetical order) which match the given word
+            at every position except the given one. The word itself doesn't have to
+            be in the vocab. """
+        if self.neighbor_index is None:
+            self.neighbor_index = self.build_neighbor_index()
+        return self.neighbor_index[position].get(word[:position] + word[position + 1:], ())
+
+    def build_neighbor_index(self) -> list[dict]:
+        """ Returns a list with a dict for each position. Each dict maps a word with
+            the letter at that position removed to the words that share it. """
+        neighbor_index = []
+        for position in range(WORD_LENGTH):
+            groups = dict()
+            # Words are in alphabetical order, so each group is too
+            for word in self.words:
+                groups.setdefault(word[:position] + word[position + 1:], []).append(word)
+            neighbor_index.append({key: tuple(group) for key, group in groups.items()})
+        return neighbor_index
+
+
+def get_shared_vocab(vocab) -> SharedVocab:
+    """ Returns the given vocab if it's already shared, otherwise wraps it """
+    if isinstance(vocab, SharedVocab):
+        return vocab
+    return SharedVocab(vocab)
+
+
+class ProbabilityOverrides(dict):
+    """ The letter probabilities of one position for one game. Probabilities that the
+        game changes are stored in this dict, and all others are read from the shared
+        base Counter, so the base is never copied or modified. """
+    def __init__(self, base: Counter):
+        super().__init__()
+        self.base = base
+
+    def __missing__(self, char):
+        return self.base[char]
+
+    def __deepcopy__(self, memo) -> 'ProbabilityOverrides':
+        # Copy the overrides, but keep sharing the base
+        overrides = ProbabilityOverrides(self.base)
+        overrides.update(self)
+        return overrides
+
+
+def get_probability_overrides(letter_probability_distribution: list[Counter]) -> list[ProbabilityOverrides]:
+    """ Returns a list of ProbabilityOverrides over the given shared distribution, which
+        can be read and written like the distribution itself """
+    return [ProbabilityOverrides(table) for table in letter_probability_distribution]
+
+
+class SharedArrays:
+    """ Publishes read-only arrays in shared memory, so worker processes can attach to
+        them without copying (see attach_arrays). The process that creates a SharedArrays
+        owns the memory, and frees it when closed, so it should be used as a context
+        manager around the lifetime of the workers. """
+    def __init__(self):
+        # Shared memory blocks created by this process
+        self.blocks = []
+        # Name, shape and dtype of each published array, keyed by array name
+        self.specs = dict()
+
+    def publish(self, name: str, array: np.ndarray):
+        """ Copies the given array into a new shared memory block """
+        # A block can't be empty
+        block = shared_memory.SharedMemory(create=True, size=max(1, array.nbytes))
+        self.blocks.append(block)
+        shared = np.ndarray(array.shape, dtype=array.dtype, buffer=block.buf)
+        shared[...] = array
+        self.specs[name] = (block.name, array.shape, array.dtype.str)
+
+    def close(self):
+        """ Frees every block. Workers must not read the arrays afterwards. """
+        for block in self.blocks:
+            block.close()
+            block.unlink()
+        self.blocks.clear()
+        self.specs.clear()
+
+    def __enter__(self) -> 'SharedArrays':
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+# Shared memory blocks attached to by this process. They stay open until the process
+# exits, since the arrays read from them may be used at any time.
+_attached_blocks = []
+
+def attach_arrays(specs: dict) -> dict[str, np.ndarray]:
+    """ Returns the arrays published by a SharedArrays, given its specs, keyed by name.
+        The arrays are read-only views of the shared memory. """
+    arrays = dict()
+    for name, (block_name, shape, dtype) in specs.items():
+        block = shared_memory.SharedMemory(name=block_name)
+        _attached_blocks.append(block)
+        array = np.ndarray(shape, dtype=np.dtype(dtype), buffer=block.buf)
+        array.flags.writeable = False
+        arrays[name] = array
+    return arrays
@@ -1,6 +1,12 @@
 
 from collections import Counter
-import queue
+import heapq
+
+from constants import ALPHABET
+
+
+# Bit of each letter in a letter mask
+LETTER_BITS = {char: 1 << i for i, char in enumerate(ALPHABET)}
 
 
 
@@ -17,6 +23,9 @@ class StartWordFinder:
         self.letter_probs = letter_probs
         # The set of letters already eliminated or confirmed
         self.processed_letters = set()
+        # Heap of (negative score, word, letter mask) with the best word of each letter
+        # mask, built on first use (see get_best_word)
+        self.heap = None
     
     
     def get_start_words(self, first_word:str = None, max_length:int = 100) -> list[str]:
@@ -53,29 +62,55 @@ class StartWordFinder:
         
     def get_best_word(self) -> str:
         """ Returns the word in the vocabulary which eliminates or confirms the most chars """
-        # Use priority queue to get best word quickly
-        scored_words = queue.PriorityQueue()
+        if self.heap is None:
+            self.heap = self.build_heap()
+        processed_mask = self.get_letter_mask(self.processed_letters)
+        # Drop words with an eliminated/confirmed char. Processed letters are never
+        # removed, so a dropped word can't become valid again.
+        while self.heap and self.heap[0][2] & processed_mask:
+            heapq.heappop(self.heap)
+        # Return None if no word is found
+        if not self.heap:
+            return None
+        best_score, best_word, mask = self.heap[0]
+        return best_word
+
+
+    def build_heap(self) -> list[tuple]:
+        """ Groups the vocab words by the set of letters they contain, and returns a heap
+            of the best (highest score, then first alphabetically) word of each group.
+            Words in a group are eliminated at the same time, so only the best one can
+            ever be returned. Words with an already processed letter are left out. """
+        best_words = dict()
+        processed_mask = self.get_letter_mask(self.processed_letters)
         # Rate every word in vocab
         for word in self.vocab:
             score = 0
-            prev_chars = set()
+            mask = 0
             for char in word:
+                bit = LETTER_BITS.get(char, 0)
                 # If char is already eliminated/confirmed, skip word
-                if char in self.processed_letters:
+                if bit & processed_mask:
                     score = 0
                     break
                 # Increase score by each letter's probability, not counting duplicates
-                if char not in prev_chars:
+                if not bit & mask:
                     score += self.letter_probs[char]
-                prev_chars.add(char)
+                mask |= bit
             # Skip words with 0 score
-            if score > 0:
-                # Use negative score because PriorityQueue is a min heap
-                scored_words.put((-score, word))
-        # Return None if no word is found
-        if scored_words.empty():
-            return None
-        # Get best word from priority queue
-        best_score, best_word = scored_words.get()
-        return best_word
-        
\ No newline at end of file
+            if score <= 0:
+                continue
+            if mask not in best_words or (-score, word) < best_words[mask]:
+                best_words[mask] = (-score, word)
+        heap = [(score, word, mask) for mask, (score, word) in best_words.items()]
+        heapq.heapify(heap)
+        return heap
+
+
+    @staticmethod
+    def get_letter_mask(letters) -> int:
+        """ Returns an int with a bit set for each of the given letters """
+        mask = 0
+        for char in letters:
+            mask |= LETTER_BITS.get(char, 0)
+        return mask
@@ -1,65 +1,184 @@
+import DataCache
 import DataProcessing
 from GameManager import GameManager
 from SearchAgent import SearchAgent
 from BruteSearchAgent import BruteSearchAgent
 from TreeSearchAgent import TreeSearchAgent
+from EntropySearchAgent import EntropySearchAgent
+from DecisionTree import DecisionTree, DecisionTreeAgent
 from CSPAgent import Dictionary
 from CSPAgent import CSPSolver
+from CSPAgent import get_corpus
 from DataManager import DataManager
+from FeedbackMatrix import FeedbackMatrix
+from SharedData import SharedArrays, SharedVocab
+from BatchSimulator import BatchSimulator
+from GuessMemo import GuessMemo
+from Profiler import Profiler
+from constants import HARD_MODE, MEMO_AGENT_TYPES
 
+import json
+import os
 import time
 from datetime import datetime
 from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+from itertools import repeat
 from ReportDataCollector import ReportDataCollector
 
-def run(agent_type: str, test_words: list, data_manager:DataManager, test_mode:str):
-    """ Run test() and record/report duration"""
-    dataCollector = ReportDataCollector()
+# The first guess of the csp solver
+CSP_STARTING_WORD = "SLATE"
+
+def run(agent_type: str, test_words: list, data_manager:DataManager, test_mode:str, workers: int=1, stream_file: str=None, plot: bool=True, profile: bool=False, batch: bool=False, verbose: bool=True, memoize: bool=False, hard_mode: bool=HARD_MODE):
+    """ Run test() and record/report duration. If workers is greater than 1, games
+        are played in that many processes (see test_parallel). If a stream file is
+        given, each game is written to it as soon as it ends, and games already in the
+        file are skipped (see start_stream and ReportDataCollector). If plot is false, the reports are
+        written without pandas or matplotlib. If profile is true, the time spent in
+        each phase of every game is added to its row (see Profiler.py). If batch is
+        true, the games are played together (see test_batch). If verbose is false, games
+        don't print their guesses, so printing isn't included in the recorded times. If
+        memoize is true, the agents of every game share a GuessMemo, so a search is
+        only done once for each distinct feedback history (once per worker process).
+        Only the agents in MEMO_AGENT_TYPES use a memo, and batches don't need one. If
+        hard_mode is true, the brute, csp and tree search agents play Wordle's hard
+        mode. """
+    memoize = memoize and agent_type in MEMO_AGENT_TYPES
+    if stream_file is not None:
+        test_words = start_stream(stream_file, agent_type, test_mode, test_words, profile, hard_mode)
+        if test_words is None:
+            return
+    dataCollector = ReportDataCollector(stream_file)
+    if dataCollector.recorded_answers:
+        test_words = get_remaining_words(test_words, dataCollector.recorded_answers)
+        print("Resuming run:", sum(dataCollector.recorded_answers.values()), "games already recorded,", len(test_words), "remaining")
 
-    # Record test time
-    start_time = time.process_time()
+    # Record test time (CPU time of this process, or wall time when games are
+    # played in other processes)
+    get_time = time.process_time if workers <= 1 else time.perf_counter
+    start_time = get_time()
     # Using lexicon as test set for now
 
-    if(agent_type == 'csp'):
+    if batch:
+        # play every game at once, sharing the agent's decisions between games
+        data = test_batch(agent_type, test_words, data_manager, dataCollector, verbose, hard_mode)
+    elif workers > 1:
+        # run games in a pool of worker processes
+        data = test_parallel(agent_type, test_words, data_manager, dataCollector, workers, profile, verbose, memoize, hard_mode)
+    elif(agent_type == 'csp'):
         # run basic CSP test routine
-        data = test_csp(agent_type, test_words, data_manager.guess_words, dataCollector)
+        data = test_csp(agent_type, test_words, data_manager.guess_words, dataCollector, data_manager.get_feedback_matrix(), profile, verbose, hard_mode)
     else:
         # run 'brute', 'bfs', 'dfs' and 'ast'
-        data = test(agent_type, test_words, data_manager, dataCollector)
+        memo = GuessMemo() if memoize else None
+        data = test(agent_type, test_words, data_manager, dataCollector, profile, verbose, memo, hard_mode)
+        if memo is not None:
+            print("Guess memo:", memo.hits, "hits,", memo.misses, "misses")
 
     # Round duration to minutes
-    duration = time.process_time() - start_time
+    duration = get_time() - start_time
     duration = round(duration/60, 2)
     
     # Write to file
-    dataCollector.generateReport(agent_type, duration, test_mode)
+    dataCollector.generateReport(agent_type, duration, test_mode, plot)
 
     print("Total test duration:", duration, "minutes")
 
     
 
-def create_search_agent(agent_type: str, lexicon: set, letter_probs: list[Counter], start_guesses: list[str]) -> SearchAgent:
+def get_run_stream_file(run_dir: str, agent_type: str, test_mode: str, test_length: int, hard_mode: bool=HARD_MODE) -> str:
+    """ Returns the stream file of the checkpointed run in run_dir with the given
+        settings. Runs with different settings can share a folder. """
+    suffix = '_hardmode' if hard_mode else ''
+    return os.path.join(run_dir, f"{agent_type}_{test_mode}_{test_length}{suffix}.jsonl")
+
+
+def get_stream_words_file(stream_file: str) -> str:
+    """ Returns the file the settings and answers of the run streamed to the given file
+        are saved in """
+    return os.path.splitext(stream_file)[0] + '_words.json'
+
+
+def start_stream(stream_file: str, agent_type: str, test_mode: str, test_words: list, profile: bool=False, hard_mode: bool=HARD_MODE) -> list:
+    """ Returns the test words of the run streamed to the given file. The settings and
+        test words of a new run are saved next to the stream file, so a resumed run
+        plays the same answers (even in random mode), records the same columns and
+        plays the same mode of Wordle.
+        Returns None if the file belongs to a run with other settings, or to a random
+        run whose answers weren't saved. """
+    words_file = get_stream_words_file(stream_file)
+    if os.path.exists(words_file):
+        with open(words_file, 'r') as file:
+            saved = json.load(file)
+        # Runs saved before these settings were saved weren't profiled, and didn't
+        # play hard mode
+        saved_profile = saved.get('profile', False)
+        saved_hard_mode = saved.get('hard_mode', False)
+        if (saved['agent'] != agent_type or saved['mode'] != test_mode
+            or len(saved['answers']) != len(test_words) or saved_profile != profile
+            or saved_hard_mode != hard_mode):
+            print("Error:", stream_file, "is a run of", len(saved['answers']), saved['mode'],
+                  "games with the", saved['agent'], "agent", "with --profile" if saved_profile else "without --profile",
+                  "and with --hard" if saved_hard_mode else "and without --hard")
+            return None
+        return saved['answers']
+    # Easy and hard runs always play the same answers, but a random run can't be
+    # resumed without its saved answers
+    if test_mode == 'random' and os.path.exists(stream_file) and os.path.getsize(stream_file) > 0:
+        print("Error: the answers of", stream_file, "weren't saved, so the random run can't be resumed")
+        return None
+    settings = {'agent': agent_type, 'mode': test_mode, 'profile': profile, 'hard_mode': hard_mode, 'answers': test_words}
+    # Write to a temporary file first, so an interrupted write can't corrupt the run
+    DataCache.write_atomic(words_file, lambda file: json.dump(settings, file), os.path.dirname(words_file), 'w')
+    return test_words
+
+
+def get_remaining_words(test_words: list, recorded_answers: Counter) -> list:
+    """ Returns the test words without the answers that were already recorded. Each
+        recorded game skips one occurrence of its answer. """
+    skipped = recorded_answers.copy()
+    remaining = []
+    for word in test_words:
+        if skipped[word] > 0:
+            skipped[word] -= 1
+        else:
+            remaining.append(word)
+    return remaining
+
+
+def create_search_agent(agent_type: str, lexicon: set, letter_probs: list[Counter], start_guesses: list[str], feedback_matrix: FeedbackMatrix=None, decision_tree: DecisionTree=None, verbose: bool=True, memo: GuessMemo=None, hard_mode: bool=HARD_MODE, guess_vocab: SharedVocab=None) -> SearchAgent:
     """ Creates a search agent of the given type. Vocabulary is built from given lexicon, and 
-        word scoring is determined by the given letter probability distribution. """
+        word scoring is determined by the given letter probability distribution. The entropy
+        agent scores guesses using the given feedback matrix instead, and the tree agent
+        follows the given decision tree. If verbose is false, the agent doesn't print. The
+        given memo is used by the brute, tree search and entropy agents. If hard_mode is
+        true, the brute and tree search agents play Wordle's hard mode. The tree search
+        agents search through the given guess vocab, if any. """
     if agent_type == 'brute':
-        return BruteSearchAgent(lexicon, letter_probs)
-    if agent_type in ('bfs', 'dfs', 'greedy', 'astar'):
-        # Pass agent type to tree agent to choose bfs/dfs/astar
-        return TreeSearchAgent(lexicon, letter_probs, start_guesses, agent_type)
+        return BruteSearchAgent(lexicon, letter_probs, verbose=verbose, memo=memo, hard_mode=hard_mode)
+    if agent_type in ('bfs', 'dfs', 'greedy', 'beam', 'astar'):
+        # Pass agent type to tree agent to choose bfs/dfs/greedy/beam/astar
+        return TreeSearchAgent(lexicon, letter_probs, start_guesses, agent_type, feedback_matrix, verbose, memo, hard_mode, guess_vocab)
+    if agent_type == 'entropy':
+        return EntropySearchAgent(lexicon, feedback_matrix, memo)
+    if agent_type == 'tree':
+        return DecisionTreeAgent(decision_tree, lexicon, feedback_matrix, verbose)
     # If agent_type isn't handled
     print("Error: agent_type", agent_type, "was not found.")
 
 
 
-def test(agent_type: str, test_words: list, data_manager: DataManager, dataCollector: ReportDataCollector):
+def test(agent_type: str, test_words: list, data_manager: DataManager, dataCollector: ReportDataCollector, profile: bool=False, verbose: bool=True, memo: GuessMemo=None, hard_mode: bool=HARD_MODE):
     """ Runs the solver using the given agent, using each word in test_set as the answer
         (so the number of games tested is equal to the length of test_set) """
-    
+    # Only load the decision tree for the agent that uses it
+    decision_tree = data_manager.get_decision_tree() if agent_type == 'tree' else None
+
     for i, word in enumerate(test_words):
         # Create new search agent of given type
-        agent = create_search_agent(agent_type, data_manager.answer_words, data_manager.letter_probs, data_manager.start_words)
+        agent = create_search_agent(agent_type, data_manager.answer_vocab, data_manager.letter_probs, data_manager.start_words, data_manager.get_feedback_matrix(), decision_tree, verbose, memo, hard_mode, data_manager.guess_vocab)
         # Create new game
-        game = GameManager(data_manager.guess_words, agent)
+        game = GameManager(data_manager.guess_words, agent, data_manager.get_feedback_matrix(), Profiler() if profile else None, verbose)
         game.attachDataCollector(dataCollector)
         # Play game using word as answer
         datum = game.test(answer=word)
@@ -71,22 +190,21 @@ def test(agent_type: str, test_words: list, data_manager: DataManager, dataColle
         
     return []
 
-def test_csp(gaent_type: str, test_set: set, lexicon: set, dataCollector: ReportDataCollector):
+def test_csp(gaent_type: str, test_set: set, lexicon: set, dataCollector: ReportDataCollector, feedback_matrix: FeedbackMatrix=None, profile: bool=False, verbose: bool=True, hard_mode: bool=HARD_MODE):
     """ Runs toe csp solver using the given agent, using each word in test_set as the answer
         (so the number of games tested is equal to the length of test_set) """
 
-    starting_word = "SLATE"
-
     count = 0
 
     for word in test_set:
     #    print("Running Wordle", count, ": ", word)
-        print("Running Wordle")
+        if verbose:
+            print("Running Wordle")
         count += 1
 
-        game = CSPSolver(word)
+        game = CSPSolver(word, feedback_matrix, Profiler() if profile else None, verbose, hard_mode)
         game.attachDataCollector(dataCollector)
-        datum = game.test(starting_word)
+        datum = game.test(CSP_STARTING_WORD)
         # Interrupt if no data given
         if datum is None:
             print("Error: Data not found. Test stopped")
@@ -95,4 +213,95 @@ def test_csp(gaent_type: str, test_set: set, lexicon: set, dataCollector: Report
     #    if(count == 100):
     #        break
         
-    return []
\ No newline at end of file
+    return []
+
+
+
+def test_batch(agent_type: str, test_words: list, data_manager: DataManager, dataCollector: ReportDataCollector, verbose: bool=True, hard_mode: bool=HARD_MODE):
+    """ Runs the solver like test(), but plays the games in lockstep with a
+        BatchSimulator, so games with the same feedback so far share one agent """
+    feedback_matrix = data_manager.get_feedback_matrix()
+    decision_tree = data_manager.get_decision_tree() if agent_type == 'tree' else None
+    create_agent = lambda: create_search_agent(agent_type, data_manager.answer_vocab, data_manager.letter_probs, data_manager.start_words, feedback_matrix, decision_tree, verbose, hard_mode=hard_mode, guess_vocab=data_manager.guess_vocab)
+    simulator = BatchSimulator(create_agent, feedback_matrix)
+    simulator.attachDataCollector(dataCollector)
+    simulator.play(test_words)
+    return []
+
+
+
+# Data manager and guess memo of a worker process, set once when the worker starts
+# (see init_worker)
+_worker_data_manager = None
+_worker_memo = None
+
+def init_worker(state: dict, memoize: bool=False):
+    """ Attaches a worker process to the data shared by DataManager.share(), so the
+        data is sent once per worker rather than once per game, and the large arrays
+        aren't copied at all """
+    global _worker_data_manager, _worker_memo
+    _worker_data_manager = DataManager.attach(state)
+    _worker_memo = GuessMemo() if memoize else None
+
+
+def create_game(agent_type: str, word: str, data_manager: DataManager, dataCollector: ReportDataCollector, profiler: Profiler=None, verbose: bool=True, memo: GuessMemo=None, hard_mode: bool=HARD_MODE):
+    """ Returns a new game (a GameManager, or a CSPSolver for the csp agent) with the
+        given answer, which records its results in the given data collector """
+    feedback_matrix = data_manager.get_feedback_matrix()
+    if agent_type == 'csp':
+        game = CSPSolver(word, feedback_matrix, profiler, verbose, hard_mode)
+    else:
+        decision_tree = data_manager.get_decision_tree() if agent_type == 'tree' else None
+        agent = create_search_agent(agent_type, data_manager.answer_vocab, data_manager.letter_probs, data_manager.start_words, feedback_matrix, decision_tree, verbose, memo, hard_mode, data_manager.guess_vocab)
+        game = GameManager(data_manager.guess_words, agent, feedback_matrix, profiler, verbose)
+    game.attachDataCollector(dataCollector)
+    return game
+
+
+def play_game(game, word: str):
+    """ Plays a game created by create_game() and returns its test() result, which is
+        None if the game could not be solved """
+    if isinstance(game, CSPSolver):
+        return game.test(CSP_STARTING_WORD)
+    return game.test(answer=word)
+
+
+def play_game_in_worker(agent_type: str, word: str, profile: bool=False, verbose: bool=True, hard_mode: bool=HARD_MODE) -> list:
+    """ Plays a game in a worker process and returns its ReportDataCollector rows,
+        or None if the game could not be solved """
+    dataCollector = ReportDataCollector()
+    game = create_game(agent_type, word, _worker_data_manager, dataCollector, Profiler() if profile else None, verbose, _worker_memo, hard_mode)
+    if play_game(game, word) is None:
+        return None
+    return dataCollector.RunTimeData
+
+
+def test_parallel(agent_type: str, test_words: list, data_manager: DataManager, dataCollector: ReportDataCollector, workers: int, profile: bool=False, verbose: bool=True, memoize: bool=False, hard_mode: bool=HARD_MODE):
+    """ Runs the solver like test() and test_csp(), but spreads the games across a pool
+        of worker processes. Results are recorded in the order of test_words, so the
+        report matches a serial run. """
+    # Build the feedback matrix (and decision tree) once here, so workers don't each build it
+    data_manager.get_feedback_matrix()
+    if agent_type == 'tree':
+        data_manager.get_decision_tree()
+    # Convert the CSP word files here too, so workers map the packed files rather than
+    # each converting them
+    if agent_type == 'csp':
+        get_corpus()
+    # Send games in chunks to reduce communication between processes
+    chunksize = max(1, len(test_words) // (workers * 8))
+
+    # Publish the data in shared memory, which is freed once the workers are done
+    with SharedArrays() as shared_arrays:
+        state = data_manager.share(shared_arrays)
+        with ProcessPoolExecutor(workers, initializer=init_worker, initargs=(state, memoize)) as executor:
+            results = executor.map(play_game_in_worker, repeat(agent_type), test_words, repeat(profile), repeat(verbose), repeat(hard_mode), chunksize=chunksize)
+            for rows in results:
+                # Interrupt if no data given
+                if rows is None:
+                    print("Error: Data not found. Test stopped")
+                    executor.shutdown(cancel_futures=True)
+                    return
+                dataCollector.recordRows(rows)
+
+    return []
@@ -1,26 +1,41 @@
-from constants import WORD_LENGTH, ALPHABET, H_SCALE, BASE_THRESHOLD, THRESHOLD_INCREASE_FACTOR, THRESHOLD_DECREMENT, PRECISION
+from constants import WORD_LENGTH, H_SCALE, BASE_THRESHOLD, THRESHOLD_INCREASE_FACTOR, THRESHOLD_DECREMENT, PRECISION, BEAM_WIDTH, HARD_MODE
 from SearchAgent import SearchAgent
-from OrderedSet import OrderedSet
+from ConstraintState import ConstraintState
+from SharedData import SharedVocab, get_shared_vocab, get_probability_overrides
+from FeedbackMatrix import FeedbackMatrix, ratings_to_pattern, get_feedback_pattern
+from Fringe import FIFOFringe, LIFOFringe, PriorityFringe, BeamFringe
+from GuessMemo import GuessMemo
 
 from collections import Counter
-import queue
-import copy
+from array import array
 
 
-class  Node:
-    """ Nodes contain a word which might be guessed """
-    def __init__(self, word: str, prev_node: 'Node'=None):
-        # The content of a node is this potential guess word
-        self.word = word
-        self.prev = prev_node
-        self.depth = 0
+class NodeStore:
+    """ Stores the nodes of a search tree in parallel arrays. A node is an integer index
+        into the arrays, and each node's parent is the index of another node (-1 for the
+        root), so no object is created for each node. """
+    def __init__(self):
+        # The content of each node is a word which might be guessed
+        self.words = []
+        self.parents = array('i')
+        self.depths = array('i')
 
-        # Get depth from previous node
-        if self.prev != None:
-            self.depth = self.prev.depth + 1
-    def __lt__(self, other):
-        # To make priority queues work:
-        return False
+    def add(self, word: str, parent: int=-1) -> int:
+        """ Adds a node with the given word and parent, and returns the new node """
+        self.words.append(word)
+        self.parents.append(parent)
+        # Get depth from parent node
+        self.depths.append(0 if parent < 0 else self.depths[parent] + 1)
+        return len(self.words) - 1
+
+    def clear(self):
+        """ Removes every node """
+        self.words.clear()
+        del self.parents[:]
+        del self.depths[:]
+
+    def __len__(self) -> int:
+        return len(self.words)
 
 
 
@@ -28,31 +43,71 @@ class TreeSearchAgent(SearchAgent):
     """ A TreeSearchAgent must be instantiated with a vocabulary of words it can guess, 
         and a letter probability distribution (a list of Counters), from which it 
         calculates its guesses. A new agent should be instantiated for each game, as 
-        the vocab and probability distribution are adjusted each search. """
-    def __init__(self, vocab: set, letter_probability_distribution: list[Counter], start_guesses: list[str], mode: str='None'):
-        # Words that can be guessed
-        self.vocab = set(vocab)
+        the vocab and probability distribution are adjusted each search. The given vocab
+        and distribution are shared, and only the agent's changes to them are stored.
+        If verbose is False, the agent doesn't print when a search fails. If a GuessMemo
+        is given, searches done by earlier games with the same feedback are reused. In
+        hard mode, start guesses which don't use the hints so far are skipped (every
+        candidate uses them). Search trees are made of the words in the given lexicon
+        (the vocab if none is given), so words that can't be the answer connect the
+        candidates, but only vocab words are guessed. """
+    # Methods timed by a Profiler, and their phase names (see Profiler.py). The number
+    # of calls of 'expand' and 'score' are the nodes expanded and words scored.
+    PROFILED_METHODS = SearchAgent.PROFILED_METHODS | {
+        'update_candidates': 'filter',
+        'tree_search': 'search',
+        'expand': 'expand',
+        'get_score': 'score',
+        'get_best_candidate': 'fallback',
+    }
+    PROFILED_COUNTERS = ('threshold_retries',)
+    PROFILED_PARTS = ('fringe',)
+    SHARED_ATTRIBUTES = ('vocab', 'lexicon', 'feedback_matrix', 'start_guesses', 'memo')
+
+    def __init__(self, vocab: set | SharedVocab, letter_probability_distribution: list[Counter], start_guesses: list[str], mode: str='None', feedback_matrix: FeedbackMatrix=None, verbose: bool=True, memo: GuessMemo=None, hard_mode: bool=HARD_MODE, lexicon: set | SharedVocab=None):
+        # Words that can be guessed (shared by every game)
+        self.vocab = get_shared_vocab(vocab)
+        # Words the search tree is made of (shared by every game)
+        self.lexicon = self.vocab if lexicon is None else get_shared_vocab(lexicon)
+        # Words in the vocab that are consistent with all feedback so far and haven't
+        # been guessed. Only these words can have a score above 0. Until the first
+        # feedback this is the vocab's shared frozenset, and update_candidates replaces
+        # it with a new set, so the vocab is never copied
+        self.candidates = self.vocab.word_set
+        # Scores of candidates, cleared when the letter probabilities change
+        self.score_cache = dict()
+        # Optional precomputed feedback patterns used to update the candidates
+        self.feedback_matrix = feedback_matrix
         # List of adjusted letter probabilities
-        self.letter_probs = copy.deepcopy(letter_probability_distribution)
+        self.letter_probs = get_probability_overrides(letter_probability_distribution)
+        # Letters allowed at each position and letter counts, given the feedback so far
+        self.constraints = ConstraintState(hard_mode)
         # These are letters that have a confirmed position in the answer. The key is
         # the index and the value is the char
         # Example: if confimered_letters == {0: 'e', 3: 's'} then the agent knows 
         #          the first letter in the answer is 'e' and the fourth is 's'
-        self.confirmed_letters = dict()
-        # These letters are known to be in the word, but we don't know the position
-        self.known_letters = Counter()
+        self.confirmed_letters = self.constraints.green
         # Starting word for tree search
         self.root_word = 'AUDIO'
         # Agent guesses the first word found with a score above this threshold
         self.score_threshold = 0
+        # Number of searches repeated with a lower threshold
+        self.threshold_retries = 0
         # Domains of possible letters for each character in the guess. Each element
         # corresponds to a char index, and contains the possible letters for that index.
         # Each domain starts with the entire alphabet and is refined after each guess.
-        self.char_domains = [OrderedSet(ALPHABET) for _ in range(WORD_LENGTH)]
+        self.char_domains = self.constraints.allowed
         # Tracks how many guesses the agent has already made
         self.guess_count = 0
         # Sequence of guesses to start with
         self.start_guesses = start_guesses
+        # Nodes of the current search tree
+        self.nodes = NodeStore()
+        self.verbose = verbose
+        # Optional guesses of earlier games, keyed by feedback history
+        self.memo = memo
+        # Guesses and pattern codes of the feedback so far
+        self.history = []
         
         # Default to simple tree search. The tree_search function returns the first word
         # it finds under score_threshold
@@ -62,17 +117,21 @@ class TreeSearchAgent(SearchAgent):
             
         # Set the fringe and the tree search function based on the given mode
         if mode == 'bfs':     
-            self.fringe = queue.Queue()
+            self.fringe = FIFOFringe()
         elif mode == 'dfs':
-            self.fringe = queue.LifoQueue()
+            self.fringe = LIFOFringe()
         elif mode == 'greedy':
-            self.fringe = queue.PriorityQueue()
+            self.fringe = PriorityFringe()
+            self.tree_search = self.greedy_tree_search
+        elif mode == 'beam':
+            # Greedy search which only keeps the best nodes
+            self.fringe = BeamFringe(BEAM_WIDTH)
             self.tree_search = self.greedy_tree_search
         elif mode == 'astar':
-            self.fringe = queue.PriorityQueue()
+            self.fringe = PriorityFringe()
             self.tree_search = self.astar_tree_search
         else:
-            raise ValueError(f"Mode '{mode}' not found. Select from {'bfs', 'dfs', 'greedy', 'astar'}")
+            raise ValueError(f"Mode '{mode}' not found. Select from {'bfs', 'dfs', 'greedy', 'beam', 'astar'}")
     
     # --- Define abstract methods
     # See SearchAgent.py
@@ -84,157 +143,128 @@ class TreeSearchAgent(SearchAgent):
         if len(self.confirmed_letters) == WORD_LENGTH:
             return self.get_confirmed_word()
         # Use start_guesses first
-        if self.guess_count <= len(self.start_guesses):
+        if (self.guess_count <= len(self.start_guesses)
+            and self.constraints.is_valid_guess(self.start_guesses[self.guess_count - 1])):
             guess = self.start_guesses[self.guess_count - 1]
         # Tree search
         else:
-            guess = self.tree_search_with_threshold()
+            guess = self.memoized_tree_search()
         # Adjust root node for next search
         self.root_word = guess
-        # Remove guess from vocab
-        self.vocab.discard(guess)
+        # Remove guess from candidates. The shared frozenset isn't changed, since the
+        # next update_candidates removes the guess anyway (only the answer gives
+        # itself the solved pattern)
+        if not isinstance(self.candidates, frozenset):
+            self.candidates.discard(guess)
         # Return guess for the game
         return guess
 
     # See SearchAgent.py
     def process_feedback(self, guess: str, letter_ratings: list[int]):
+        self.history.append((guess, ratings_to_pattern(letter_ratings)))
         return self.adjust_letter_probs(guess, letter_ratings)
+
+
+    def memoized_tree_search(self) -> str:
+        """ Returns the result of tree_search_with_threshold(), which is looked up in
+            the memo if an earlier game had the same feedback. Every other part of the
+            agent's state is determined by the feedback and the guess, except for the
+            threshold, so it's memoized too. """
+        if self.memo is None:
+            return self.tree_search_with_threshold()
+        # The guess count tells apart searches after a guess was rejected
+        key = (tuple(self.history), self.guess_count)
+        entry = self.memo.get(key)
+        if entry is not None:
+            guess, self.score_threshold = entry
+            return guess
+        guess = self.tree_search_with_threshold()
+        self.memo.put(key, (guess, self.score_threshold))
+        return guess
+
+
+    def update_candidates(self, guess: str, letter_ratings: list[int]):
+        """ Removes candidates which would not have given the same letter ratings """
+        pattern = ratings_to_pattern(letter_ratings)
+        # Read the unfiltered candidates from the vocab's word tuple instead of copying
+        # the shared frozenset
+        candidates = self.vocab.words if isinstance(self.candidates, frozenset) else list(self.candidates)
+        if self.feedback_matrix is not None:
+            patterns = self.feedback_matrix.get_patterns(guess, candidates)
+        else:
+            patterns = [get_feedback_pattern(guess, word) for word in candidates]
+        self.candidates = {word for word, word_pattern in zip(candidates, patterns) if word_pattern == pattern}
+        # Letter probabilities are about to change
+        self.score_cache.clear()
         
     
     def get_confirmed_word(self):
         """ Returns a word using the confirmed letters """
-        chars = []
-        for i in self.confirmed_letters:
-            chars.append(self.confirmed_letters[i])
-        word = ''.join(chars)
-        return word
+        # Letters are confirmed in any order, so join them by position
+        return ''.join(self.confirmed_letters[i] for i in range(WORD_LENGTH))
             
         
         
     def clear_fringe(self):
-        """ Clears self.fringe by determining its datatype and re-instantiating """
-        fringe_type = type(self.fringe)
-        self.fringe = fringe_type()
+        """ Clears self.fringe and the nodes of the previous search """
+        self.fringe.clear()
+        self.nodes.clear()
         
 
     def adjust_letter_probs(self, guess: str, letter_ratings: list[int]):
         """ Takes a guess and its corresponding ratings, and updates
             letter_probs for each character in the guess. """
-        # Track letters that are in the word, but we don't know the position
-        new_known_letters = Counter()
-        # Check every letter in the guess and its corresponding rating
-        for i, rating in enumerate(letter_ratings):
-            char = guess[i]
-            # If letter is correct, set probability to 1
-            if rating == '2':
-                # If letter was known without position, remove it from the tracker
-                if char in self.known_letters:
-                    self.known_letters[char] -= 1
-                    # Prevent negative values
-                    if self.known_letters[char] < 0:        
-                        self.known_letters[char] = 0
-                # Track confirmed letter
-                self.confirmed_letters[i] = char
-                # Set proability to 1
-                self.letter_probs[i][char] = 1
-                # Restrict domain to this letter
-                self.char_domains[i] = OrderedSet(char)
-            # If letter is known, but in the wrong position, set prob to 0 and track it
-            elif rating == '1':
-                self.letter_probs[i][char] = 0
-                new_known_letters[char] += 1
-                # Remove letter from domain
-                self.char_domains[i].discard(char)
-            # If letter is incorrect, set probability to 0
-            elif rating == '0':
-                self.letter_probs[i][char] = 0
-                # Remove letter from domain
-                self.char_domains[i].discard(char)
-                # Adjust probabilities of other positions and remove letter from 
-                # char domains corresponding to those positions
-                # ToDo: I'm not sure whether this accounts for all edge cases
-                # Make sure letter is not already known (without position)
-                if char not in new_known_letters:
-                    # Loop through probability tables for every char position
-                    for j, table in enumerate(self.letter_probs):
-                        # Make sure letter is not already known (with position)
-                        if table[char] != 1:
-                            # Set probability to 0
-                            table[char] = 0
-                            # Remove letter from domain
-                            self.char_domains[j].discard(char)
-        # Add new known letters to persistent list
-        for char, count in new_known_letters.items():
-            # Only add if the count in the new list is greater
-            # E.g., if the letter was not previously known, or if only 1 was known,
-            # but now there are 2.
-            if count > self.known_letters[char]:
-                # Update count
-                self.known_letters[char] = count
+        # Keep only candidates that are consistent with the ratings
+        self.update_candidates(guess, letter_ratings)
+        # Remove letters from the domains of positions they can't be at, and adjust
+        # their probabilities to match
+        self.constraints.update(guess, letter_ratings)
+        self.constraints.apply_to_letter_probs(self.letter_probs)
 
 
     def get_score(self, word: str) -> float:
         """ Returns a word score equal to the sum of the probability of each letter
-            being in its respective position. """
-        score = 0
-        # Make sure word is in vocab
-        if word not in self.vocab:
+            being in its respective position. Words which are not consistent with the
+            feedback so far have a score of 0. """
+        # Only candidates can be the answer. Candidates contain every confirmed and
+        # known letter, so they don't have to be checked
+        if word not in self.candidates:
             return 0
-        
-        # Make sure confirmed letters are accounted for by removing each letter
-        # from a list of chars in the word
-        chars = list(word)
-        for position, letter in self.confirmed_letters.items():
-            if letter in chars:
-                chars.remove(letter)
-            else:
-                # Not all confirmed letters are in the word
-                return 0
-        # Repeat with known letters
-        for letter, count in self.known_letters.items():
-            # Repeat for count of each letter
-            for i in range(count):
-                if letter in chars:
-                    chars.remove(letter)
-                else:
-                    # Not all known letters are in the word
-                    return 0            
-
-        # For each character
-        for i, char in enumerate(word):
-            # Get probability
-            prob = self.letter_probs[i][char]
-            # If any letter prob is 0, then the entire word score is 0
-            if prob == 0:
-                return 0
-            # Add probability of character to score
-            score += prob
-        # Return rounded score
-        return round(score, PRECISION)
-
-
-    def expand(self, node: Node, prev_words: set) -> list:
+        score = self.score_cache.get(word)
+        if score is None:
+            # Sum probability of each character
+            score = 0
+            for i, char in enumerate(word):
+                score += self.letter_probs[i][char]
+            # Round and cache score
+            score = round(score, PRECISION)
+            self.score_cache[word] = score
+        return score
+
+
+    def expand(self, node: int, prev_words: set) -> list:
         """ Expands the given node, excluding words in prev_words. A list of the
-            successor nodes is returned. Successor words are added to prev_words. """
+            successor nodes is returned. Successor words are added to prev_words. 
+            Successors are the lexicon words that differ from the node's word by one
+            letter in that position's domain (confirmed letters are never changed). """
         successors = []
+        word = self.nodes.words[node]
         # For each character in the word
-        for i, char in enumerate(node.word):
+        for i, char in enumerate(word):
             # Skip confirmed letters
             if i in self.confirmed_letters:
                 continue
-            # Try changing the char to each letter in its domain
-            for letter in self.char_domains[i]:
-                # Make sure it's not the same letter
-                if letter != char:
-                    # Insert letter to make new word
-                    new_word = node.word[:i] + letter + node.word[i+1:]
+            domain = self.char_domains[i]
+            # Try each lexicon word that only differs at this position
+            for new_word in self.lexicon.get_neighbors(word, i):
+                letter = new_word[i]
+                # Make sure it's not the same letter, and the letter is in the domain
+                if letter != char and letter in domain:
                     # Make sure word wasn't previously visited
                     if new_word not in prev_words:
-                        # ToDo
-                        #print('trying', new_word)
                         prev_words.add(new_word)
                         # Create node with new word and add to successor list
-                        new_node = Node(new_word, node)
+                        new_node = self.nodes.add(new_word, node)
                         successors.append(new_node)
         return successors
     
@@ -290,7 +320,7 @@ class TreeSearchAgent(SearchAgent):
             # Replace letter at index i
             root = root[:i] + self.confirmed_letters[i] + root[i+1:]
         # Insert root into fringe
-        root_node = Node(root)
+        root_node = self.nodes.add(root)
         self.fringe.put(root_node)
 
         # While there are nodes in the fringe
@@ -298,16 +328,17 @@ class TreeSearchAgent(SearchAgent):
             # Get node from fringe
             node = self.fringe.get()
             # If the node's score is above the threshold
-            if self.get_score(node.word) > self.score_threshold:
+            if self.get_score(self.nodes.words[node]) > self.score_threshold:
                 # Guess word
-                return node.word
+                return self.nodes.words[node]
             # Else expand node
             successors = self.expand(node, prev_words)
             # Add successors to fringe
             for succ_node in successors:
                 self.fringe.put(succ_node)
         # No word was found outside the threshold
-        print("No word found with score above threshold =", self.score_threshold)
+        if self.verbose:
+            print("No word found with score above threshold =", self.score_threshold)
         return None
     
     
@@ -328,28 +359,32 @@ class TreeSearchAgent(SearchAgent):
             # Replace letter at index i
             root = root[:i] + self.confirmed_letters[i] + root[i+1:]
         # Insert root into fringe
-        root_node = Node(root)
+        root_node = self.nodes.add(root)
         # Use score of 0 for root node
-        self.fringe.put((0, root_node))
+        self.fringe.put((0, root_node), 0)
+
+        # Note: the fringe stores (score, node) so that score doesn't have to be
+        # calculated again after removing it from the fringe
 
         # While there are nodes in the fringe
         while not self.fringe.empty():
             # Get node from fringe
             score, node = self.fringe.get()
-            # If the node's score is above the threshold (priority queue holds negative score)
-            if -score > self.score_threshold:
+            # If the node's score is above the threshold
+            if score > self.score_threshold:
                 # Guess word
-                return node.word
+                return self.nodes.words[node]
             # Else expand node
             successors = self.expand(node, prev_words)
             # Add successors to fringe
             for succ_node in successors:
                 # Get word's score
-                score = self.get_score(succ_node.word)
-                # Store negative score because priority queue gets lowest
-                self.fringe.put((-score, succ_node))
+                score = self.get_score(self.nodes.words[succ_node])
+                # Use negative score as priority because the fringe gets lowest
+                self.fringe.put((score, succ_node), -score)
         # No word was found outside the threshold
-        print("No word found with score above threshold =", self.score_threshold)
+        if self.verbose:
+            print("No word found with score above threshold =", self.score_threshold)
         return None
     
     
@@ -360,13 +395,13 @@ class TreeSearchAgent(SearchAgent):
         # Track words already parsed
         prev_words = set()
         
-        def get_priority(node: Node, word_score: float) -> float:
+        def get_priority(node: int, word_score: float) -> float:
             # This constant scales the difference between a current word's score and
             # the current score threshold in astar, in order to estimate the number
             # of nodes until a word above the threshold is reached
             heuristic = H_SCALE * (self.score_threshold - word_score)
             # Priority is depth + heuristic
-            priority = node.depth + heuristic
+            priority = self.nodes.depths[node] + heuristic
             return priority
 
         # Clear fringe
@@ -378,33 +413,34 @@ class TreeSearchAgent(SearchAgent):
             # Replace letter at index i
             root = root[:i] + self.confirmed_letters[i] + root[i+1:]
         # Insert root into fringe
-        root_node = Node(root)
+        root_node = self.nodes.add(root)
         # Use score of 0 for root node
-        self.fringe.put((0, 0, root_node))
+        self.fringe.put((0, root_node), 0)
         
-        # Note: the fringe stores (priority, score, node) so that score doesn't have
-        # to be calculated again when checking if the node is in the threshold after
+        # Note: the fringe stores (score, node) so that score doesn't have to be
+        # calculated again when checking if the node is in the threshold after
         # removing it from the fringe
 
         # While there are nodes in the fringe
         while not self.fringe.empty():
             # Get node from fringe
-            _, score, node = self.fringe.get()
+            score, node = self.fringe.get()
             # If the node's score is above the threshold (priority queue holds negative score)
             if score > self.score_threshold:
                 # Guess word
-                return node.word
+                return self.nodes.words[node]
             # Else expand node
             successors = self.expand(node, prev_words)
             # Add successors to fringe
             for succ_node in successors:
                 # Get word's score and calculate priority using heuristic
-                score = self.get_score(succ_node.word)
+                score = self.get_score(self.nodes.words[succ_node])
                 priority = get_priority(succ_node, score)
                 # Push to fringe
-                self.fringe.put((priority, score, succ_node))
+                self.fringe.put((score, succ_node), priority)
         # No word was found outside the threshold
-        print("No word found with score above threshold =", self.score_threshold)
+        if self.verbose:
+            print("No word found with score above threshold =", self.score_threshold)
         return None
         
     def tree_search_with_threshold(self) -> str:
@@ -420,6 +456,12 @@ class TreeSearchAgent(SearchAgent):
             # Starting threshold
             BASE_THRESHOLD - THRESHOLD_DECREMENT
         
+        # No word can be found if there are no candidates
+        if not self.candidates:
+            if self.verbose:
+                print("No guess found")
+            return None
+
         # Repeat tree search while lowering threshold
         threshold_can_decrease = True
         while threshold_can_decrease: 
@@ -435,10 +477,19 @@ class TreeSearchAgent(SearchAgent):
             else:
                 # Decrease threshold
                 self.score_threshold -= THRESHOLD_DECREMENT
+                self.threshold_retries += 1
                 # Prevent negative threshold
                 if self.score_threshold < 0:
                     self.score_threshold = 0
-        print("No guess found")
+        # The tree only contains words connected to the root by single letter changes,
+        # so a candidate may not be reachable. Fall back to the best candidate
+        return self.get_best_candidate()
+
+
+    def get_best_candidate(self) -> str:
+        """ Returns the candidate with the highest score (the first alphabetically
+            if there is a tie) """
+        return min(self.candidates, key=lambda word: (-self.get_score(word), word))
             
         
 
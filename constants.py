@@ -27,6 +27,13 @@ BASE_THRESHOLD = 0.5
 THRESHOLD_DECREMENT = 0.3
 # The factor by which the treshold scales with the number of confirmed letters
 THRESHOLD_INCREASE_FACTOR = 0.3
+# Maximum number of nodes kept in the fringe of beam search
+BEAM_WIDTH = 50
+# If True, the brute and tree search agents play Wordle's hard mode, where every
+# guess must use the hints revealed so far (see ConstraintState.py)
+HARD_MODE = False
+# Maximum number of feedback histories whose guesses are remembered (see GuessMemo.py)
+GUESS_MEMO_SIZE = 20000
 # Number of decimal places to round to when performing calculations
 PRECISION = 4
 
@@ -34,7 +41,9 @@ PRECISION = 4
 # The internal max guess limit to identify errors
 MAX_GUESS_LIMIT = 100
 # The types of agents that can be used
-AGENT_TYPES = ('brute', 'csp', 'bfs', 'dfs', 'greedy', 'astar')
+AGENT_TYPES = ('brute', 'csp', 'bfs', 'dfs', 'greedy', 'astar', 'beam', 'entropy', 'tree')
+# The types of agents that can reuse searches with a GuessMemo
+MEMO_AGENT_TYPES = ('brute', 'bfs', 'dfs', 'greedy', 'astar', 'beam', 'entropy')
 
 
 # English alphabet
@@ -43,3 +52,14 @@ ALPHABET = 'ABCDEFGHIJKLMNOPQRSTUVWXYZ'
 MAX_GUESS_COUNT = 6
 # The length of words
 WORD_LENGTH = 5
+
+
+# Directory for preprocessed data, which is reused while the data files and
+# the settings above are unchanged. Delete it to force preprocessing.
+CACHE_DIR = '.cache'
+# Data files used by DataManager
+LEXICON_FILE = 'Data/wordle_lexicon.txt'
+SOLUTIONS_FILE = 'Data/valid_solutions.csv'
+# Guess words that are not possible answers, used by the CSP module
+GUESSES_FILE = 'Data/valid_guesses.csv'
+ORDERED_SOLUTIONS_FILE = 'Data/valid_solutions_ordered.csv'
@@ -1,40 +1,116 @@
 import Tester
 from GameManager import GameManager
 from DataManager import DataManager
-from constants import AGENT_TYPES, SINGLE_TEST_WORD
+from constants import AGENT_TYPES, MEMO_AGENT_TYPES, SINGLE_TEST_WORD, HARD_MODE
 
 import sys
 
 """ This file runs the Wordle Solver """
 
 
-def test_wordle(data: DataManager, agent_type: str, test_length: int, test_mode: str):
+def test_wordle(data: DataManager, agent_type: str, test_length: int, test_mode: str, workers: int=1, stream_file: str=None, plot: bool=True, run_dir: str=None, profile: bool=False, batch: bool=False, verbose: bool=True, memoize: bool=False, hard_mode: bool=HARD_MODE):
     """ Runs series of tests using given search type
     Args:
-        agent_type (str): The type of search: ('brute', 'csp', 'bfs', 'dfs', 'greedy', 'astar')
+        agent_type (str): The type of search: ('brute', 'csp', 'bfs', 'dfs', 'greedy', 'astar', 'beam', 'entropy', 'tree')
         test_length (int): The number of games to run tests on
+        workers (int): The number of processes to play games in
+        stream_file (str): A .csv or .jsonl file to write each game to as it ends, which resumes the run
+        plot (bool): Whether to plot the guess counts
+        run_dir (str): A folder to stream the run to, in a file named after its settings
+        profile (bool): Whether to record the time spent in each phase of every game
+        batch (bool): Whether to play the games together, sharing the agent's decisions
+        verbose (bool): Whether to print the guesses of every game
+        memoize (bool): Whether games reuse the guesses of earlier games with the same feedback
+        hard_mode (bool): Whether the agents play Wordle's hard mode
     """
     # Check for single test word
     if SINGLE_TEST_WORD != None:
-        Tester.run(agent_type, [SINGLE_TEST_WORD], data, test_mode)
+        test_words = [SINGLE_TEST_WORD]
     else: 
         test_words = data.get_answers(test_length, test_mode)
-        Tester.run(agent_type, test_words, data, test_mode)
+    if run_dir is not None:
+        # Stream to the run's file in run_dir, which continues the run if it was started
+        stream_file = Tester.get_run_stream_file(run_dir, agent_type, test_mode, len(test_words), hard_mode)
+    Tester.run(agent_type, test_words, data, test_mode, workers, stream_file, plot, profile, batch, verbose, memoize, hard_mode)
     
     
 def print_how_to():
     print("Run the program with three arguments like so:")
-    print("$ python main.py <agent_type> <test_length> <test_mode>")
-    print("    <agent_type>  - The search agent type (brute, csp, bfs, dfs, greedy, astar)")
-    print("    <test_length> - The number of games to solve (1 to 1000)")
+    print("$ python main.py <agent_type> <test_length> <test_mode> [options]")
+    print("    <agent_type>  - The search agent type (brute, csp, bfs, dfs, greedy, astar, beam, entropy, tree)")
+    print("    <test_length> - The number of games to solve (1 to the number of answers, 2315)")
     print("    <test_mode>   - The difficulty level of games  (hard, easy, random)")
+    print("Options:")
+    print("    --workers N   - Play games in N processes (default 1)")
+    print("    --stream FILE - Write each game to FILE (.csv or .jsonl) as it ends. Running")
+    print("                    the same command again resumes the run, replaying the same")
+    print("                    answers")
+    print("    --no-plot     - Don't plot the results (reports are written without pandas)")
+    print("    --run-dir DIR - Stream the run to a file in DIR named after its settings,")
+    print("                    so runs with different settings can share DIR")
+    print("    --profile     - Add the time spent in each phase of a game (e.g. filter,")
+    print("                    score, expand) and related counts to each game's results")
+    print("    --quiet       - Don't print the guesses of each game, which also keeps")
+    print("                    printing out of the recorded times")
+    print("    --memo        - Remember the guess made after each feedback history, so")
+    print("                    games with the same feedback so far don't search again")
+    print("                    (not for csp or tree, and not with --batch or --profile)")
+    print("    --hard        - Play Wordle's hard mode, where every guess must use the hints")
+    print("                    revealed so far (brute, csp and the tree search agents)")
+    print("    --batch       - Play every game at once, turn by turn, so games with the")
+    print("                    same feedback share the agent's guesses (not for csp, and")
+    print("                    not with --workers or --profile)")
+
+
+def parse_options(args: list[str]) -> dict:
+    """ Returns a dictionary of the options in the given arguments, or None if an
+        option is invalid. Options that aren't given have their default value. """
+    options = {'workers': 1, 'stream': None, 'plot': True, 'run_dir': None, 'profile': False, 'batch': False, 'verbose': True, 'memoize': False, 'hard_mode': HARD_MODE}
+    i = 0
+    while i < len(args):
+        if args[i] == '--workers' and i + 1 < len(args) and args[i + 1].isdigit():
+            options['workers'] = int(args[i + 1])
+            i += 2
+        elif args[i] == '--memo':
+            options['memoize'] = True
+            i += 1
+        elif args[i] == '--hard':
+            options['hard_mode'] = True
+            i += 1
+        elif args[i] == '--quiet':
+            options['verbose'] = False
+            i += 1
+        elif args[i] == '--batch':
+            options['batch'] = True
+            i += 1
+        elif args[i] == '--profile':
+            options['profile'] = True
+            i += 1
+        elif args[i] == '--no-plot':
+            options['plot'] = False
+            i += 1
+        elif args[i] == '--run-dir' and i + 1 < len(args):
+            options['run_dir'] = args[i + 1]
+            i += 2
+        elif args[i] == '--stream' and i + 1 < len(args):
+            options['stream'] = args[i + 1]
+            i += 2
+        else:
+            print("Unknown option:", args[i])
+            return None
+    return options
+
 
 def main():
     # Get system arguments
     args = sys.argv
 
     # Check number of arguments
-    if len(args) != 4:
+    if len(args) < 4:
+        print_how_to()
+        return
+    options = parse_options(args[4:])
+    if options is None:
         print_how_to()
         return
     
@@ -45,13 +121,21 @@ def main():
     
     if (agent_type not in AGENT_TYPES
         or test_length < 1
-        or test_length > 1000):
+        or options['workers'] < 1
+        or (options['stream'] is not None and options['run_dir'] is not None)
+        or (options['batch'] and (agent_type == 'csp' or options['workers'] > 1 or options['profile']))
+        or (options['hard_mode'] and agent_type in ('entropy', 'tree'))
+        # A memo hit skips the search, so profiles would only time the misses
+        or (options['memoize'] and (agent_type not in MEMO_AGENT_TYPES or options['batch'] or options['profile']))):
         print_how_to()
         return
     
     # Run tests
     data = DataManager()
-    test_wordle(data, agent_type, test_length, test_mode)
+    if test_length > len(data.answer_words):
+        print_how_to()
+        return
+    test_wordle(data, agent_type, test_length, test_mode, options['workers'], options['stream'], options['plot'], options['run_dir'], options['profile'], options['batch'], options['verbose'], options['memoize'], options['hard_mode'])
     
 
 if __name__ == '__main__':